@@ -11,9 +11,30 @@ def parse_args() -> argparse.Namespace:
     или `--urls-file`.
     - `--urls-file (str)`: путь к файлу со списком URL-адресов для парсинга. Может быть использован только один из
     двух аргументов: `--url` или `--urls-file`. По умолчанию установлено значение `urls.txt`.
-    - `--interval (int)`: интервал в секундах между автоматическими запусками парсинга. По умолчанию не установлен.
+    - `--interval (int)`: интервал в секундах между автоматическими запусками парсинга каждой сети. Интервал отдельной
+    сети можно указать в файле со списком URL-адресов параметром `interval=СЕКУНДЫ`. По умолчанию не установлен.
     - `--start (str)`: дата начала периода парсинга в формате ГГГГММДД. По умолчанию не установлен.
     - `--end (str)`: дата окончания периода парсинга в формате ГГГГММДД. По умолчанию не установлен.
+    - `--concurrency (int)`: максимальное количество одновременных запросов постов для одной сети. По умолчанию 8.
+    - `--global-concurrency (int)`: максимальное количество одновременных запросов к API для всех сетей. Лимит
+    автоматически снижается, если сервер ограничивает запросы. По умолчанию 16.
+    - `--retries (int)`: количество повторов неудачного запроса. По умолчанию 3.
+    - `--workers (int)`: количество сетей, которые парсятся параллельно. По умолчанию 1.
+    - `--page-size (int)`: количество постов на одной странице при получении списка постов. По умолчанию 100.
+    - `--state-db (str)`: путь к файлу SQLite с состоянием постов для инкрементального парсинга. По умолчанию не
+    установлен.
+    - `--format (str)`: формат выходного файла: `csv`, `jsonl`, `parquet`, `arrow` или `sqlite`. По умолчанию `csv`.
+    - `--write-buffer-kb (int)`: размер буфера записи файла в килобайтах. По умолчанию 1024.
+    - `--flush-rows (int)`: количество строк, после которых буфер записи сбрасывается на диск, 0 - сбрасывать только
+    при заполнении буфера. По умолчанию 1000.
+    - `--cache-dir (str)`: директория дискового кеша HTTP-ответов. По умолчанию не установлен.
+    - `--cache-max-mb (int)`: максимальный размер дискового кеша в мегабайтах. По умолчанию 512.
+    - `--resume`: продолжить прерванный цикл парсинга с последней контрольной точки. По умолчанию не установлен.
+    - `--metrics-file (str)`: путь к JSON-файлу метрик, который перезаписывается после каждого цикла парсинга. По
+    умолчанию не установлен.
+    - `--metrics-port (int)`: порт HTTP-сервера, отдающего метрики в формате Prometheus по адресу `/metrics`. По
+    умолчанию не установлен.
+    - `--check`: проверить аргументы и список URL-адресов без парсинга. По умолчанию не установлен.
     - `--log (str)`: уровень логирования. Возможные значения: `DEBUG`, `INFO`, `WARNING`, `ERROR`, `CRITICAL`.
     По умолчанию установлено значение `WARNING`.
 
@@ -53,6 +74,94 @@ def parse_args() -> argparse.Namespace:
         type=str,
         help="Установите дату окончания в формате ГГГГММДД (по умолчанию не установлен)",
     )
+    parser.add_argument(
+        "--concurrency",
+        default=8,
+        type=int,
+        help="Установите количество одновременных запросов постов для одной сети (по умолчанию: 8)",
+    )
+    parser.add_argument(
+        "--global-concurrency",
+        default=16,
+        type=int,
+        help="Установите количество одновременных запросов к API для всех сетей (по умолчанию: 16)",
+    )
+    parser.add_argument(
+        "--retries",
+        default=3,
+        type=int,
+        help="Установите количество повторов неудачного запроса (по умолчанию: 3)",
+    )
+    parser.add_argument(
+        "--workers",
+        default=1,
+        type=int,
+        help="Установите количество сетей, которые парсятся параллельно (по умолчанию: 1)",
+    )
+    parser.add_argument(
+        "--page-size",
+        default=100,
+        type=int,
+        help="Установите количество постов на одной странице списка постов (по умолчанию: 100)",
+    )
+    parser.add_argument(
+        "--state-db",
+        default=None,
+        type=str,
+        help="Путь к файлу SQLite для инкрементального парсинга (по умолчанию не установлен)",
+    )
+    parser.add_argument(
+        "--format",
+        default="csv",
+        choices=["csv", "jsonl", "parquet", "arrow", "sqlite"],
+        help="Установите формат выходного файла (по умолчанию: csv)",
+    )
+    parser.add_argument(
+        "--write-buffer-kb",
+        default=1024,
+        type=int,
+        help="Установите размер буфера записи файла в килобайтах (по умолчанию: 1024)",
+    )
+    parser.add_argument(
+        "--flush-rows",
+        default=1000,
+        type=int,
+        help="Установите количество строк, после которых данные сбрасываются на диск (по умолчанию: 1000)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        type=str,
+        help="Директория дискового кеша HTTP-ответов (по умолчанию не установлен)",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        default=512,
+        type=int,
+        help="Установите максимальный размер дискового кеша в мегабайтах (по умолчанию: 512)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Продолжить прерванный цикл парсинга с последней контрольной точки",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        type=str,
+        help="Путь к JSON-файлу метрик, обновляемому после каждого цикла (по умолчанию не установлен)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        default=None,
+        type=int,
+        help="Порт HTTP-сервера с метриками в формате Prometheus (по умолчанию не установлен)",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Проверить аргументы и список URL-адресов без парсинга",
+    )
     log_levels = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
     parser.add_argument(
         "--log",
@@ -0,0 +1,158 @@
+"""
+Сквозной бенчмарк парсинга одной сети на локальном сервере `mock_server.py`.
+
+Запускает сервер в отдельном процессе, чтобы он не делил GIL с парсером, направляет на него API
+(`POLKASSEMBLY_API_URL`) и выполняет `process_url` так же, как `run.py`. Выводит JSON с количеством
+постов и строк в секунду, пиковым RSS процесса парсера, перцентилями p50/p99 времени HTTP-запросов
+(каждая попытка, включая повторы, считается отдельно) и счетчиками статусов ответов сервера.
+Результаты разных коммитов можно сравнивать по полю `commit`.
+
+Использование:
+    python benchmarks/bench_crawl.py [--posts 200] [--comments 20] [--latency-ms 50] [--throttle-rate 0.02]
+        [--concurrency 8] [--format csv] [--repeat 3]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+from typing import Any
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, BASE_DIR)
+
+from mock_server import add_corpus_arguments  # noqa: E402
+
+
+def start_server(args: argparse.Namespace) -> tuple[subprocess.Popen[str], str]:
+    """Запускает `mock_server.py` с параметрами корпуса и возвращает процесс и базовый адрес сервера."""
+    command = [sys.executable, os.path.join(BENCHMARKS_DIR, "mock_server.py")]
+    for name in ("topics", "posts", "comments", "latency_ms", "error_rate", "throttle_rate", "seed"):
+        command += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    assert server.stdout is not None
+    return server, json.loads(server.stdout.readline())["url"]
+
+
+def timed_send(latencies: list[float]) -> None:
+    """Заменяет `requests.Session.send` оберткой, которая добавляет время каждого запроса в `latencies`."""
+    import requests
+
+    send = requests.Session.send
+
+    def send_with_timing(self: requests.Session, request: requests.PreparedRequest, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return send(self, request, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    requests.Session.send = send_with_timing  # type: ignore[method-assign]
+
+
+def percentile(values: list[float], percent: int) -> float | None:
+    if len(values) < 2:
+        return values[0] if values else None
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_corpus_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=8, help="количество одновременных запросов постов")
+    parser.add_argument("--global-concurrency", type=int, default=16, help="общий лимит одновременных запросов")
+    parser.add_argument("--retries", type=int, default=3, help="количество повторов неудачного запроса")
+    parser.add_argument("--page-size", type=int, default=100, help="количество постов на странице списка")
+    parser.add_argument("--format", default="csv", help="формат выходного файла")
+    parser.add_argument("--repeat", type=int, default=1, help="количество прогонов, выводится лучший по времени")
+    args = parser.parse_args()
+
+    server, base_url = start_server(args)
+    try:
+        # Адрес API читается при импорте constants, поэтому модули парсера импортируются после запуска сервера.
+        os.environ["POLKASSEMBLY_API_URL"] = f"{base_url}/api/v1"
+        from http_client import configure
+        from process_url import process_url
+        from sinks import create_sink
+
+        configure(max_concurrency=args.global_concurrency, max_retries=args.retries)
+        latencies: list[float] = []
+        timed_send(latencies)
+
+        runs = []
+        for _ in range(max(args.repeat, 1)):
+            latencies.clear()
+            stats_before = json.load(urllib.request.urlopen(f"{base_url}/__stats"))
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                sink = create_sink(args.format, os.path.join(tmp_dir, f"bench.{args.format}"))
+                started = time.perf_counter()
+                try:
+                    process_url(
+                        f"{base_url}/",
+                        "mock",
+                        sink,
+                        concurrency=args.concurrency,
+                        page_size=args.page_size,
+                    )
+                finally:
+                    sink.close()
+                elapsed = time.perf_counter() - started
+                output_bytes = os.path.getsize(sink.file_pathname)
+            server_stats = Counter(json.load(urllib.request.urlopen(f"{base_url}/__stats")))
+            server_stats.subtract(stats_before)
+            runs.append(
+                {
+                    "elapsed_s": round(elapsed, 3),
+                    "posts": server_stats["posts"],
+                    "rows": sink.rows_written,
+                    "posts_per_s": round(server_stats["posts"] / elapsed, 1),
+                    "rows_per_s": round(sink.rows_written / elapsed, 1),
+                    "output_mb": round(output_bytes / 1024 / 1024, 2),
+                    "requests": len(latencies),
+                    "latency_ms": {
+                        "p50": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+                        "p99": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+                    },
+                    "server_status": {key: value for key, value in server_stats.items() if key.isdigit()},
+                }
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+    # ru_maxrss в Linux измеряется в килобайтах, в macOS - в байтах.
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = max_rss / 1024 / 1024 if sys.platform == "darwin" else max_rss / 1024
+    result = {
+        "benchmark": "crawl",
+        "commit": git_commit(),
+        "config": {key: value for key, value in vars(args).items()},
+        **min(runs, key=lambda run: run["elapsed_s"]),
+        "peak_rss_mb": round(peak_rss_mb, 1),
+    }
+    if len(runs) > 1:
+        result["elapsed_s_runs"] = [run["elapsed_s"] for run in runs]
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
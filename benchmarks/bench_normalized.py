@@ -0,0 +1,125 @@
+"""
+Бенчмарк нормализованного формата SQLite по сравнению с CSV.
+
+Записывает одни и те же строки результатов парсинга в CSV-файл и в нормализованную базу SQLite (`--format sqlite`)
+и выводит JSON с размерами файлов и временем записи.
+
+Использование:
+    python benchmarks/bench_normalized.py [crawl.csv ...]
+
+В качестве входных данных можно передать CSV-файлы, полученные парсером. Без аргументов используется синтетический
+набор данных нескольких сетей с постами по несколько килобайт и десятками комментариев к каждому.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sinks import COLUMNS, create_sink  # noqa: E402
+
+
+def synthetic_rows(networks: int = 5, posts: int = 200, max_comments: int = 60) -> Iterator[list[Any]]:
+    """Выдает строки результатов парсинга для синтетических сетей."""
+    random.seed(1)
+    started = datetime(2023, 1, 1)
+    for network in range(networks):
+        for post in range(posts):
+            created_at = started + timedelta(hours=post)
+            post_fields = [
+                "ReferendumV2",
+                "General",
+                created_at,
+                post,
+                f"author{post % 50}",
+                f"Referendum {post} of network {network}",
+                "Proposal text with motivation and links. " * random.randint(20, 120),
+                "Executed",
+                random.randint(0, 30),
+                random.randint(0, 5),
+            ]
+            link = f"https://network{network}.polkassembly.io/referendum/{post}"
+            comments = random.randint(0, max_comments)
+            if not comments:
+                yield [*post_fields, *(None,) * 8, link]
+            for comment in range(comments):
+                yield [
+                    *post_fields,
+                    "I support this proposal. " * random.randint(1, 10),
+                    f"voter{comment % 300}",
+                    created_at + timedelta(minutes=comment),
+                    random.randint(0, 10),
+                    random.randint(0, 3),
+                    f"comment-{network}-{post}-{comment}",
+                    f"comment-{network}-{post}-{comment - 1}" if comment % 3 else None,
+                    1 if comment % 3 else 0,
+                    link,
+                ]
+
+
+def csv_rows(pathname: str) -> Iterator[list[Any]]:
+    """Выдает типизированные строки из CSV-файла, полученного парсером."""
+    with open(pathname, newline="") as file:
+        reader = csv.reader(file)
+        next(reader)
+        for row in reader:
+            yield [_typed(value, kind) for value, (_, _, kind) in zip(row, COLUMNS)]
+
+
+def write(output_format: str, pathname: str, rows: list[list[Any]]) -> float:
+    started = time.perf_counter()
+    with create_sink(output_format, pathname, flush_rows=0) as sink:
+        for row in rows:
+            sink.write_row(row)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк нормализованного формата SQLite")
+    parser.add_argument("files", nargs="*", help="CSV-файлы с результатами парсинга")
+    args = parser.parse_args()
+
+    rows = [row for pathname in args.files for row in csv_rows(pathname)] if args.files else list(synthetic_rows())
+    with tempfile.TemporaryDirectory() as directory:
+        csv_pathname = os.path.join(directory, "crawl.csv")
+        sqlite_pathname = os.path.join(directory, "crawl.sqlite")
+        csv_seconds = write("csv", csv_pathname, rows)
+        sqlite_seconds = write("sqlite", sqlite_pathname, rows)
+        csv_size = os.path.getsize(csv_pathname)
+        sqlite_size = os.path.getsize(sqlite_pathname)
+
+    print(
+        json.dumps(
+            {
+                "input": args.files or "synthetic",
+                "rows": len(rows),
+                "posts": len({row[-1] for row in rows}),
+                "csv": {"mb": round(csv_size / 1024 / 1024, 2), "seconds": round(csv_seconds, 3)},
+                "sqlite": {"mb": round(sqlite_size / 1024 / 1024, 2), "seconds": round(sqlite_seconds, 3)},
+                "size_reduction": round(1 - sqlite_size / csv_size, 3) if csv_size else None,
+            }
+        )
+    )
+
+
+def _typed(value: str, kind: str) -> Any:
+    if value == "":
+        return None
+    if kind == "int":
+        return int(value)
+    if kind == "datetime":
+        return datetime.fromisoformat(value)
+    return value
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Микробенчмарк получения топиков из HTML-страницы Polkassembly.
+
+Сравнивает поиск скрипта `__NEXT_DATA__` по байтам (`scan_next_data`) с прежним разбором всей страницы
+BeautifulSoup/lxml. Для каждой страницы выводит JSON со средним временем и пиковой памятью обоих способов.
+
+Использование:
+    python benchmarks/bench_parse_topics.py [page.html ...] [--repeat N]
+
+Без аргументов используется синтетическая страница, похожая на страницу сети Polkassembly. Сохранить страницу
+сети для сравнения можно командой `curl -o moonbeam.html https://moonbeam.polkassembly.network/`.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parse_topics import CHUNK_SIZE, count_topics, parse_next_data_html, scan_next_data  # noqa: E402
+
+
+def synthetic_page(topics: int = 12, posts_per_topic: int = 10, markup_kb: int = 300) -> bytes:
+    """Возвращает синтетическую страницу с разметкой и скриптом `__NEXT_DATA__`."""
+    latest_posts: dict[str, Any] = {"all": {"data": {"count": topics * posts_per_topic, "posts": []}}}
+    for topic in range(topics):
+        posts = [
+            {"post_id": post, "title": f"Post {post}", "content": "Lorem ipsum dolor sit amet. " * 40}
+            for post in range(posts_per_topic)
+        ]
+        latest_posts[f"topic_{topic}"] = {"data": {"count": posts_per_topic, "posts": posts}}
+    next_data = json.dumps({"props": {"pageProps": {"latestPosts": latest_posts}}})
+    markup = '<div class="item"><span>Polkassembly</span><a href="/post/1">link</a></div>' * (markup_kb * 14)
+    return (
+        f'<!DOCTYPE html><html><head><title>Polkassembly</title></head><body>{markup}'
+        f'<script id="__NEXT_DATA__" type="application/json">{next_data}</script>'
+        f'<script src="/_next/static/chunks/main.js"></script></body></html>'
+    ).encode()
+
+
+def fast_path(page: bytes) -> dict[str, int]:
+    chunks = (page[i : i + CHUNK_SIZE] for i in range(0, len(page), CHUNK_SIZE))
+    _, script = scan_next_data(chunks)
+    return count_topics(json.loads(script or b"{}"))
+
+
+def soup_path(page: bytes) -> dict[str, int]:
+    return count_topics(parse_next_data_html(page) or {})
+
+
+def measure(func: Callable[[bytes], dict[str, int]], page: bytes, repeat: int) -> dict[str, float]:
+    """Возвращает среднее время в миллисекундах и пиковую память в килобайтах для функции."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(page)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    func(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": round(elapsed * 1000, 3), "peak_kb": round(peak / 1024, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк получения топиков из HTML-страницы")
+    parser.add_argument("pages", nargs="*", help="Пути к сохраненным HTML-страницам")
+    parser.add_argument("--repeat", default=20, type=int, help="Количество повторов (по умолчанию: 20)")
+    args = parser.parse_args()
+
+    fixtures = [(path, open(path, "rb").read()) for path in args.pages] or [("synthetic", synthetic_page())]
+    for name, page in fixtures:
+        if fast_path(page) != soup_path(page):
+            print(f"{name}: результаты способов различаются", file=sys.stderr)
+        fast = measure(fast_path, page, args.repeat)
+        soup = measure(soup_path, page, args.repeat)
+        print(
+            json.dumps(
+                {
+                    "page": name,
+                    "size_kb": round(len(page) / 1024, 1),
+                    "scan": fast,
+                    "soup": soup,
+                    "speedup": round(soup["ms"] / fast["ms"], 1) if fast["ms"] else None,
+                    "memory_ratio": round(soup["peak_kb"] / fast["peak_kb"], 1) if fast["peak_kb"] else None,
+                }
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Бенчмарк разбора поста с большим количеством комментариев.
+
+Сравнивает прежний способ формирования строк (словарь ответа API живет до конца записи, `datetime.strptime` для
+каждого комментария, список из 16 значений на строку) с записями `records.Post`/`records.Comment` и сравнением
+дат комментариев как строк. Выводит JSON со временем и памятью на один комментарий.
+
+Использование:
+    python benchmarks/bench_records.py [--comments N] [--repeat N]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from get_post_data import extract_post, iter_post_rows  # noqa: E402
+
+
+def synthetic_post(comments: int) -> dict[str, Any]:
+    """Возвращает ответ API с постом и заданным количеством комментариев."""
+    started = datetime(2023, 1, 1)
+    reactions = {"👍": {"count": 3, "usernames": ["a", "b", "c"]}, "👎": {"count": 0, "usernames": []}}
+    return {
+        "post_id": 1,
+        "type": "ReferendumV2",
+        "title": " Large discussion ",
+        "content": "Proposal text.\n" * 200,
+        "status": "Executed",
+        "created_at": "2023-01-01T00:00:00.000Z",
+        "user_id": 1,
+        "username": "author",
+        "topic": {"id": 1, "name": "General"},
+        "post_reactions": reactions,
+        "comments": [
+            {
+                "id": f"comment-{index}",
+                "content": f"Comment number {index}.\nSecond line.",
+                "username": f"user{index % 500}",
+                "user_id": index,
+                "created_at": (started + timedelta(seconds=index)).strftime("%Y-%m-%dT%H:%M:%S.%f")[:23] + "Z",
+                "updated_at": "2023-06-01T00:00:00.000Z",
+                "comment_reactions": reactions,
+                "replies": [],
+                "sentiment": 0,
+            }
+            for index in range(comments)
+        ],
+    }
+
+
+def legacy_rows(post_data: dict[str, Any], start_date: datetime) -> list[list[Any]]:
+    """Формирует строки так, как это делалось до появления `records`."""
+    rows = []
+    for comment in post_data["comments"]:
+        comment_date = datetime.strptime(comment["created_at"], "%Y-%m-%dT%H:%M:%S.%fZ")
+        if comment_date < start_date:
+            continue
+        rows.append(
+            [
+                post_data.get("type"),
+                post_data["topic"]["name"],
+                post_data["created_at"][:19].replace("T", " "),
+                post_data.get("user_id"),
+                post_data.get("username"),
+                str(post_data.get("title", "Untitled")).strip() or "Untitled",
+                post_data.get("content", "").replace("\n", " "),
+                post_data.get("status"),
+                post_data["post_reactions"]["👍"]["count"],
+                post_data["post_reactions"]["👎"]["count"],
+                comment["content"].replace("\n", " "),
+                comment["username"],
+                comment["created_at"][:19].replace("T", " "),
+                comment["comment_reactions"]["👍"]["count"],
+                comment["comment_reactions"]["👎"]["count"],
+                "https://polkadot.polkassembly.io/referendum/1",
+            ]
+        )
+    return rows
+
+
+def record_rows(post_data: dict[str, Any], start_date: datetime) -> list[Any]:
+    """Формирует строки через `records`; ответ API после разбора больше не нужен."""
+    record = extract_post(post_data, "https://polkadot.polkassembly.io/", "referendums_v2", start_date)
+    return list(iter_post_rows(record))
+
+
+def measure(func: Callable[[dict[str, Any], datetime], list[Any]], comments: int, repeat: int) -> dict[str, float]:
+    start_date = datetime(2023, 1, 1)
+    elapsed = 0.0
+    for _ in range(repeat):
+        post_data = synthetic_post(comments)
+        started = time.perf_counter()
+        func(post_data, start_date)
+        elapsed += time.perf_counter() - started
+
+    post_data = synthetic_post(comments)
+    gc.collect()
+    tracemalloc.start()
+    result = func(post_data, start_date)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        "us_per_comment": round(elapsed / repeat / comments * 1e6, 3),
+        "peak_bytes_per_comment": round(peak / comments, 1),
+        "retained_bytes_per_comment": round(retained / comments, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк разбора поста с большим количеством комментариев")
+    parser.add_argument("--comments", default=50000, type=int, help="Количество комментариев (по умолчанию: 50000)")
+    parser.add_argument("--repeat", default=5, type=int, help="Количество повторов (по умолчанию: 5)")
+    args = parser.parse_args()
+
+    legacy = measure(legacy_rows, args.comments, args.repeat)
+    records = measure(record_rows, args.comments, args.repeat)
+    print(
+        json.dumps(
+            {
+                "comments": args.comments,
+                "legacy": legacy,
+                "records": records,
+                "speedup": round(legacy["us_per_comment"] / records["us_per_comment"], 2),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Бенчмарк обхода дерева ответов на комментарии в посте с большой дискуссией.
+
+Строит синтетический пост с заданным количеством ответов одной из форм дерева: `chain` - каждый ответ дан на
+предыдущий (глубина равна количеству ответов), `wide` - ответы на комментарии поста (глубина 1), `random` - ответ
+на случайный более ранний комментарий или ответ. Сравнивает рекурсивный обход с `get_post_data.iter_comment_tree`
+и измеряет разбор поста `extract_post` без периода и с концом периода посередине дискуссии, когда ответы
+на более поздние комментарии не просматриваются. Выводит JSON со временем и памятью на один комментарий.
+
+Использование:
+    python benchmarks/bench_replies.py [--replies 50000] [--comments 100] [--shape random] [--repeat 5]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from get_post_data import extract_post, iter_comment_tree, iter_post_rows  # noqa: E402
+from records import format_timestamp  # noqa: E402
+
+STARTED_AT = datetime(2023, 1, 1)
+SHAPES = ("chain", "wide", "random")
+
+
+def synthetic_post(comments: int, replies: int, shape: str, seed: int = 1) -> dict[str, Any]:
+    """Возвращает ответ API с постом, комментариями и вложенными ответами заданной формы."""
+    rng = random.Random(seed)
+    reactions = {"👍": {"count": 3, "usernames": ["a", "b", "c"]}, "👎": {"count": 0, "usernames": []}}
+    nodes = [
+        {
+            "id": f"comment-{index}",
+            "content": f"Comment number {index}.\nSecond line.",
+            "username": f"user{index % 500}",
+            "created_at": format_timestamp(STARTED_AT + timedelta(minutes=index)),
+            "comment_reactions": reactions,
+            "replies": [],
+        }
+        for index in range(max(comments, 1))
+    ]
+    top_level = list(nodes)
+    for index in range(replies):
+        if shape == "chain":
+            parent = nodes[-1]
+        elif shape == "wide":
+            parent = top_level[index % len(top_level)]
+        else:
+            parent = nodes[rng.randrange(len(nodes))]
+        created_at = datetime.fromisoformat(parent["created_at"][:19]) + timedelta(seconds=index + 1)
+        reply = {
+            "id": f"reply-{index}",
+            "content": f"Reply number {index}.",
+            "username": f"user{index % 500}",
+            "created_at": format_timestamp(created_at),
+            "reply_reactions": reactions,
+            "replies": [],
+        }
+        parent["replies"].append(reply)
+        nodes.append(reply)
+    return {
+        "post_id": 1,
+        "type": "Discussions",
+        "title": "Large discussion",
+        "content": "Proposal text.\n" * 200,
+        "status": None,
+        "created_at": format_timestamp(STARTED_AT),
+        "user_id": 1,
+        "username": "author",
+        "topic": {"id": 1, "name": "General"},
+        "post_reactions": reactions,
+        "comments": top_level,
+    }
+
+
+def recursive_walk(comments: list[dict[str, Any]], parent_id: str | None = None, depth: int = 0) -> Iterator[Any]:
+    """Рекурсивный обход дерева ответов для сравнения."""
+    for comment in comments:
+        yield comment, parent_id, depth
+        yield from recursive_walk(comment.get("replies") or [], comment["id"], depth + 1)
+
+
+def middle_date(post_data: dict[str, Any]) -> datetime:
+    comments = post_data["comments"]
+    return datetime.fromisoformat(comments[len(comments) // 2]["created_at"][:19])
+
+
+def walk(func: Callable[..., Iterator[Any]]) -> Callable[[dict[str, Any]], Any]:
+    return lambda post_data: sum(1 for _ in func(post_data["comments"]))
+
+
+def parse(end: bool) -> Callable[[dict[str, Any]], Any]:
+    def run(post_data: dict[str, Any]) -> Any:
+        end_date = middle_date(post_data) if end else None
+        record = extract_post(post_data, "https://polkadot.polkassembly.io/", "discussions", end_date=end_date)
+        return list(iter_post_rows(record))
+
+    return run
+
+
+def measure(func: Callable[[dict[str, Any]], Any], post_data: dict[str, Any], nodes: int, repeat: int) -> Any:
+    try:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func(post_data)
+        elapsed = time.perf_counter() - started
+    except RecursionError:
+        return "RecursionError"
+
+    gc.collect()
+    tracemalloc.start()
+    result = func(post_data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        "us_per_comment": round(elapsed / repeat / nodes * 1e6, 3),
+        "peak_bytes_per_comment": round(peak / nodes, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replies", default=50000, type=int, help="Количество ответов (по умолчанию: 50000)")
+    parser.add_argument("--comments", default=100, type=int, help="Количество комментариев поста (по умолчанию: 100)")
+    parser.add_argument("--shape", default="random", choices=SHAPES, help="Форма дерева ответов")
+    parser.add_argument("--repeat", default=5, type=int, help="Количество повторов (по умолчанию: 5)")
+    args = parser.parse_args()
+
+    post_data = synthetic_post(args.comments, args.replies, args.shape)
+    nodes = sum(1 for _ in iter_comment_tree(post_data["comments"]))
+    print(
+        json.dumps(
+            {
+                "shape": args.shape,
+                "comments": nodes,
+                "max_depth": max(depth for _, _, depth in iter_comment_tree(post_data["comments"])),
+                "recursive_walk": measure(walk(recursive_walk), post_data, nodes, args.repeat),
+                "iterative_walk": measure(walk(iter_comment_tree), post_data, nodes, args.repeat),
+                "extract_post": measure(parse(end=False), post_data, nodes, args.repeat),
+                "extract_post_end_pruned": measure(parse(end=True), post_data, nodes, args.repeat),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
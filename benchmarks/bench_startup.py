@@ -0,0 +1,101 @@
+"""
+Бенчмарк времени запуска `run.py` по данным `python -X importtime`.
+
+Для каждого сценария запуска (`--help`, `--check`, импорт `run` и импорт модулей парсинга `process_url`) запускает
+отдельный процесс Python с `-X importtime` и выводит JSON со временем запуска процесса, суммарным временем импорта,
+самыми долгими импортами верхнего уровня и списком загруженных тяжелых модулей (`HEAVY_MODULES`). Сценарии
+`--help` и `--check` не должны загружать тяжелые модули: с аргументом `--strict` бенчмарк завершается с кодом 1,
+если они загружены, поэтому его можно использовать для проверки регрессий времени запуска.
+
+Использование:
+    python benchmarks/bench_startup.py [--repeat 5] [--top 5] [--strict]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from bench_crawl import git_commit  # noqa: E402
+
+HEAVY_MODULES = ("requests", "urllib3", "bs4", "lxml", "pyarrow", "http.server")
+SCENARIOS = {
+    "help": ["run.py", "--help"],
+    "check": ["run.py", "--check", "--url", "https://kilt.polkassembly.network/"],
+    "import_run": ["-c", "import run"],
+    "import_process_url": ["-c", "import process_url"],
+}
+LIGHT_SCENARIOS = ("help", "check")
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int, int]]:
+    """
+    Разбирает вывод `-X importtime`.
+
+    Аргументы:
+    - `stderr` (str): вывод процесса в stderr.
+
+    Возвращает:
+    `list[tuple]`: название модуля, уровень вложенности импорта (0 - верхний уровень), собственное
+    и суммарное время импорта в микросекундах."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), level, int(self_us), int(cumulative_us)))
+    return imports
+
+
+def measure(command: list[str], top: int) -> dict[str, Any]:
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *command], cwd=BASE_DIR, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    imports = parse_importtime(process.stderr)
+    modules = {name for name, _, _, _ in imports}
+    top_level = sorted((item for item in imports if item[1] == 0), key=lambda item: item[3], reverse=True)
+    return {
+        "returncode": process.returncode,
+        "wall_ms": round(elapsed * 1000, 1),
+        "import_ms": round(sum(self_us for _, _, self_us, _ in imports) / 1000, 1),
+        "modules": len(modules),
+        "heavy_modules": [name for name in HEAVY_MODULES if name in modules],
+        "slowest_imports_ms": {name: round(cumulative_us / 1000, 1) for name, _, _, cumulative_us in top_level[:top]},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="количество запусков, выводится самый быстрый")
+    parser.add_argument("--top", type=int, default=5, help="количество самых долгих импортов в выводе")
+    parser.add_argument("--strict", action="store_true", help="код 1, если --help или --check загружают тяжелые модули")
+    args = parser.parse_args()
+
+    results = {}
+    for scenario, command in SCENARIOS.items():
+        runs = [measure(command, args.top) for _ in range(max(args.repeat, 1))]
+        results[scenario] = min(runs, key=lambda run: run["wall_ms"])
+    print(
+        json.dumps(
+            {"benchmark": "startup", "commit": git_commit(), "python": sys.version.split()[0], "scenarios": results},
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+    if args.strict and any(results[scenario]["heavy_modules"] for scenario in LIGHT_SCENARIOS):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
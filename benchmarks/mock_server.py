@@ -0,0 +1,295 @@
+"""
+Локальный сервер, заменяющий сайт и API Polkassembly для бенчмарков.
+
+Отдает страницу сети со скриптом `__NEXT_DATA__` (любой путь вне `/api/v1`), список постов
+`/api/v1/listing/{on,off}-chain-posts` и посты с комментариями `/api/v1/posts/{on,off}-chain-post`
+в том же виде, в каком их получают `parse_topics`, `parse_posts` и `get_post_data`. Посты с комментариями
+генерируются детерминированно по ID поста при каждом запросе, в памяти хранится только список постов.
+
+Задержка ответа, доля ошибок 500 и доля ответов 429 с заголовком `Retry-After` настраиваются.
+Счетчики запросов и статусов ответов доступны по адресу `/__stats`.
+
+Использование:
+    python benchmarks/mock_server.py [--port 8080] [--topics 3] [--posts 200] [--comments 20] [--latency-ms 50]
+        [--error-rate 0.01] [--throttle-rate 0.02]
+
+После запуска сервер выводит в stdout строку JSON с базовым адресом. Парсер можно направить на сервер:
+    POLKASSEMBLY_API_URL=http://127.0.0.1:8080/api/v1 python run.py --url http://127.0.0.1:8080/
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import format_timestamp  # noqa: E402
+
+TOPICS = [
+    "referendums_v2",
+    "discussions",
+    "treasury_proposals",
+    "council_motions",
+    "bounties",
+    "tips",
+    "democracy_proposals",
+    "fellowship_referendums",
+]
+STARTED_AT = datetime(2023, 1, 1)
+
+
+class MockPolkassembly:
+    """
+    Синтетический корпус постов и настройки ответов сервера.
+
+    Аргументы:
+    - `topics` (int): количество непустых топиков, не больше `len(TOPICS)`.
+    - `posts` (int): количество постов в каждом топике.
+    - `comments` (int): среднее количество комментариев к посту, фактическое - от 0 до двойного среднего.
+    - `latency_ms` (float): средняя задержка ответа в миллисекундах, фактическая - от половины до полуторной.
+    - `error_rate` (float): доля ответов 500.
+    - `throttle_rate` (float): доля ответов 429.
+    - `seed` (int): начальное значение генератора случайных чисел корпуса.
+    """
+
+    def __init__(
+        self,
+        topics: int = 3,
+        posts: int = 200,
+        comments: int = 20,
+        latency_ms: float = 0,
+        error_rate: float = 0,
+        throttle_rate: float = 0,
+        seed: int = 1,
+    ) -> None:
+        self.topics = TOPICS[: max(min(topics, len(TOPICS)), 1)]
+        self.posts = posts
+        self.comments = comments
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.seed = seed
+        self.stats: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._listings = {topic: self._build_listings(topic) for topic in self.topics}
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def topic_page(self) -> bytes:
+        """Возвращает страницу сети со скриптом `__NEXT_DATA__`."""
+        latest_posts: dict[str, Any] = {"all": {"data": {"count": self.posts * len(self.topics), "posts": []}}}
+        for topic in self.topics:
+            latest_posts[topic] = {"data": {"count": self.posts, "posts": self._listings[topic][:10]}}
+        next_data = json.dumps({"props": {"pageProps": {"latestPosts": latest_posts}}})
+        markup = '<div class="item"><a href="/post/1">Polkassembly</a></div>' * 2000
+        return (
+            f"<!DOCTYPE html><html><head><title>Polkassembly</title></head><body>{markup}"
+            f'<script id="__NEXT_DATA__" type="application/json">{next_data}</script></body></html>'
+        ).encode()
+
+    def listing(self, topic: str, page: int, page_size: int, sort_by: str | None) -> dict[str, Any]:
+        """Возвращает страницу списка постов топика в порядке `sort_by`: `commented`, `oldest` или от новых."""
+        listings = self._listings.get(topic, [])
+        if sort_by == "commented":
+            listings = sorted(listings, key=lambda post: post["last_comment_at"] or post["created_at"], reverse=True)
+        elif sort_by != "oldest":
+            listings = listings[::-1]
+        start = (page - 1) * page_size
+        return {"count": len(listings), "posts": listings[start : start + page_size]}
+
+    def post(self, topic: str, post_id: int) -> dict[str, Any] | None:
+        """Возвращает пост с комментариями или None, если поста нет в корпусе."""
+        if topic not in self._listings or not 1 <= post_id <= self.posts:
+            return None
+        rng = self._rng(topic, post_id)
+        created_at = self._created_at(post_id)
+        comments = []
+        for index in range(self._comments_count(topic, post_id)):
+            comments.append(
+                {
+                    "id": f"{topic}-{post_id}-{index}",
+                    "content": "I support this proposal.\n" * rng.randint(1, 10),
+                    "username": f"voter{rng.randint(0, 300)}",
+                    "created_at": format_timestamp(created_at + timedelta(minutes=10 * (index + 1))),
+                    "comment_reactions": {"👍": {"count": rng.randint(0, 10)}, "👎": {"count": rng.randint(0, 3)}},
+                    "replies": [],
+                }
+            )
+        return {
+            "post_id": post_id,
+            "type": topic.title(),
+            "title": f"{topic} {post_id}",
+            "content": "Proposal text with motivation and links.\n" * rng.randint(20, 120),
+            "status": rng.choice(["Deciding", "Executed", "Rejected"]),
+            "created_at": format_timestamp(created_at),
+            "user_id": rng.randint(1, 5000),
+            "username": f"author{rng.randint(0, 50)}",
+            "topic": {"name": "General"},
+            "post_reactions": {"👍": {"count": rng.randint(0, 30)}, "👎": {"count": rng.randint(0, 5)}},
+            "comments": comments,
+        }
+
+    def _build_listings(self, topic: str) -> list[dict[str, Any]]:
+        listings = []
+        for post_id in range(1, self.posts + 1):
+            created_at = self._created_at(post_id)
+            comments_count = self._comments_count(topic, post_id)
+            last_comment_at = created_at + timedelta(minutes=10 * comments_count) if comments_count else None
+            listings.append(
+                {
+                    "post_id": post_id,
+                    "title": f"{topic} {post_id}",
+                    "created_at": format_timestamp(created_at),
+                    "last_comment_at": format_timestamp(last_comment_at) if last_comment_at else None,
+                    "comments_count": comments_count,
+                }
+            )
+        return listings
+
+    def _comments_count(self, topic: str, post_id: int) -> int:
+        return random.Random(f"{self.seed}:{topic}:{post_id}:comments").randint(0, 2 * self.comments)
+
+    def _rng(self, topic: str, post_id: int) -> random.Random:
+        return random.Random(f"{self.seed}:{topic}:{post_id}")
+
+    @staticmethod
+    def _created_at(post_id: int) -> datetime:
+        return STARTED_AT + timedelta(hours=post_id)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов к `MockPolkassembly`, который хранится в атрибуте `corpus` сервера."""
+
+    protocol_version = "HTTP/1.1"
+    # Заголовки и тело ответа отправляются отдельными записями в keep-alive соединение. Без TCP_NODELAY тело
+    # задерживается алгоритмом Нейгла до подтверждения заголовков, которое клиент откладывает (delayed ACK):
+    # около 40 мс на каждый запрос. StreamRequestHandler.setup устанавливает TCP_NODELAY по этому атрибуту.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        corpus: MockPolkassembly = self.server.corpus  # type: ignore[attr-defined]
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if url.path == "/__stats":
+            self._send(200, json.dumps(corpus.stats).encode(), "application/json")
+            return
+
+        corpus.count("requests")
+        if corpus.latency_ms:
+            time.sleep(corpus.latency_ms * random.uniform(0.5, 1.5) / 1000)
+        roll = random.random()
+        if roll < corpus.throttle_rate:
+            self._send(429, b"Too Many Requests", "text/plain", {"Retry-After": "0"})
+            return
+        if roll < corpus.throttle_rate + corpus.error_rate:
+            self._send(500, b"Internal Server Error", "text/plain")
+            return
+
+        if url.path.startswith("/api/v1/listing/"):
+            body = corpus.listing(
+                params.get("proposalType", ""),
+                int(params.get("page", 1)),
+                int(params.get("listingLimit", 10)),
+                params.get("sortBy"),
+            )
+            self._send(200, json.dumps(body).encode(), "application/json")
+        elif url.path.startswith("/api/v1/posts/"):
+            post = corpus.post(params.get("proposalType", ""), int(params.get("postId", -1)))
+            if post is None:
+                self._send(404, b'{"message": "Post not found"}', "application/json")
+                return
+            corpus.count("posts")
+            self._send(200, json.dumps(post).encode(), "application/json")
+        elif url.path.startswith("/api/"):
+            self._send(404, b'{"message": "Not found"}', "application/json")
+        else:
+            self._send(200, corpus.topic_page(), "text/html; charset=utf-8")
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: dict[str, str] | None = None) -> None:
+        if self.path != "/__stats":
+            self.server.corpus.count(str(status))  # type: ignore[attr-defined]
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def create_server(corpus: MockPolkassembly, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Создает сервер для корпуса. Если `port` равен 0, выбирается свободный порт.
+
+    Аргументы:
+    - `corpus` (MockPolkassembly): корпус постов и настройки ответов.
+    - `host` (str): адрес сервера.
+    - `port` (int): порт сервера.
+
+    Возвращает:
+    `ThreadingHTTPServer`: сервер, который нужно запустить вызовом `serve_forever`."""
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.corpus = corpus  # type: ignore[attr-defined]
+    return server
+
+
+def add_corpus_arguments(parser: argparse.ArgumentParser) -> None:
+    """Добавляет в парсер аргументы корпуса и настроек ответов сервера."""
+    parser.add_argument("--topics", type=int, default=3, help=f"количество топиков (не больше {len(TOPICS)})")
+    parser.add_argument("--posts", type=int, default=200, help="количество постов в каждом топике")
+    parser.add_argument("--comments", type=int, default=20, help="среднее количество комментариев к посту")
+    parser.add_argument("--latency-ms", type=float, default=0, help="средняя задержка ответа в миллисекундах")
+    parser.add_argument("--error-rate", type=float, default=0, help="доля ответов 500")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="доля ответов 429")
+    parser.add_argument("--seed", type=int, default=1, help="начальное значение генератора корпуса")
+
+
+def corpus_from_args(args: argparse.Namespace) -> MockPolkassembly:
+    return MockPolkassembly(
+        topics=args.topics,
+        posts=args.posts,
+        comments=args.comments,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="адрес сервера")
+    parser.add_argument("--port", type=int, default=0, help="порт сервера, 0 - любой свободный")
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+
+    server = create_server(corpus_from_args(args), args.host, args.port)
+    host, port = server.server_address[:2]
+    print(json.dumps({"url": f"http://{host}:{port}"}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import threading
+from concurrent.futures import Executor
+
+stop_requested = threading.Event()
+
+
+def check_stopped() -> None:
+    """
+    Прерывает парсинг в рабочем потоке, если программа останавливается по <kbd>CTRL</kbd>+<kbd>C</kbd>.
+
+    `KeyboardInterrupt` доставляется только главному потоку, поэтому потоки, которые парсят сети, проверяют флаг
+    `stop_requested` перед каждым постом, страницей списка постов и попыткой запроса к API.
+
+    Исключения:
+    - `KeyboardInterrupt`: если установлен флаг `stop_requested`."""
+    if stop_requested.is_set():
+        raise KeyboardInterrupt
+
+
+def stop_executor(executor: Executor) -> None:
+    """
+    Останавливает парсинг в пуле потоков без ожидания: устанавливает флаг `stop_requested` и отменяет задачи,
+    которые еще не начали выполняться. Запущенные задачи завершаются при следующей проверке `check_stopped`.
+
+    Аргументы:
+    - `executor` (Executor): пул потоков.
+
+    Возвращает:
+    `None`"""
+    stop_requested.set()
+    executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any
+
+from sinks import Sink
+
+CHECKPOINT_FILENAME = ".checkpoint.jsonl"
+CHECKPOINT_POSTS = 100
+CHECKPOINT_SECONDS = 30
+
+
+class Checkpoint:
+    """
+    Журнал контрольных точек цикла парсинга для продолжения прерванного запуска.
+
+    Журнал - файл JSON Lines. Первая строка описывает цикл: формат и пути выходных файлов каждой сети.
+    Каждая контрольная точка записывается после сброса выходного файла на диск и содержит его размер
+    и посты (номер сети в списке `jobs` цикла, тип поста, ID поста), строки которых полностью записаны до этой
+    позиции. После завершения сети записывается отметка о ее завершении. Сети различаются по номеру, а не по
+    названию, так как у разных URL-адресов название сети может совпадать.
+
+    При продолжении выходной файл обрезается до размера из последней контрольной точки, что удаляет
+    недописанные строки, а обработанные посты и завершенные сети пропускаются.
+    """
+
+    def __init__(self, journal_pathname: str, cycle: dict[str, Any], entries: list[dict[str, Any]]) -> None:
+        self.journal_pathname = journal_pathname
+        self.cycle = cycle
+        self._lock = threading.Lock()
+        self._completed: set[tuple[int, str, str]] = set()
+        self._offsets: dict[str, int] = {}
+        self._rows: dict[str, int] = defaultdict(int)
+        self._finished: dict[int, bool] = {}
+        for entry in entries:
+            if "finished" in entry:
+                self._finished[entry["finished"]] = entry["has_data"]
+                continue
+            self._offsets[entry["output"]] = entry["offset"]
+            self._rows[entry["output"]] += entry["rows"]
+            self._completed.update(tuple(unit) for unit in entry["units"])
+        self._pending: dict[str, list[list[Any]]] = defaultdict(list)
+        self._committed_rows: dict[str, int] = defaultdict(int)
+        self._committed_at: dict[str, float] = defaultdict(time.monotonic)
+        self._file = open(journal_pathname, mode="a", encoding="utf-8")
+
+    @classmethod
+    def create(cls, journal_pathname: str, cycle: dict[str, Any]) -> Checkpoint:
+        """
+        Создает новый журнал, заменяя журнал предыдущего цикла.
+
+        Аргументы:
+        - `journal_pathname` (str): путь к файлу журнала.
+        - `cycle` (dict): описание цикла: `format` - формат выходных файлов, `file_pathname` - путь к итоговому
+          файлу, `use_shards` - пишутся ли сети в отдельные части, `jobs` - список из URL, сети и выходного файла.
+
+        Возвращает:
+        `Checkpoint`: журнал контрольных точек."""
+        with open(journal_pathname, mode="w", encoding="utf-8") as journal:
+            journal.write(json.dumps({"cycle": cycle}, ensure_ascii=False) + "\n")
+            _sync(journal)
+        return cls(journal_pathname, cycle, [])
+
+    @classmethod
+    def load(cls, journal_pathname: str) -> Checkpoint | None:
+        """
+        Читает журнал прерванного цикла.
+
+        Недописанная последняя строка журнала отбрасывается, и файл обрезается до последней полной записи.
+
+        Аргументы:
+        - `journal_pathname` (str): путь к файлу журнала.
+
+        Возвращает:
+        `Checkpoint | None`: журнал контрольных точек или None, если журнала нет или он пуст."""
+        if not os.path.exists(journal_pathname):
+            return None
+        entries = []
+        valid_size = 0
+        with open(journal_pathname, mode="rb") as journal:
+            for line in journal:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+                valid_size += len(line)
+        if not entries or "cycle" not in entries[0]:
+            return None
+        if valid_size < os.path.getsize(journal_pathname):
+            os.truncate(journal_pathname, valid_size)
+        return cls(journal_pathname, entries[0]["cycle"], entries[1:])
+
+    def is_completed(self, job: int, proposal_type: str, post_id: int | str) -> bool:
+        """Проверяет, записаны ли строки поста сети с номером `job` до последней контрольной точки."""
+        return (job, proposal_type, str(post_id)) in self._completed
+
+    def finished(self, job: int) -> bool | None:
+        """Возвращает None, если сеть с номером `job` не завершена, иначе - были ли записаны данные сети."""
+        return self._finished.get(job)
+
+    def rows(self, output_pathname: str) -> int:
+        """Возвращает количество строк, записанных в выходной файл до последней контрольной точки."""
+        return self._rows[output_pathname] + self._committed_rows[output_pathname]
+
+    def offset(self, output_pathname: str) -> int:
+        """Возвращает размер выходного файла в последней контрольной точке или 0, если точек еще не было."""
+        return self._offsets.get(output_pathname, 0)
+
+    def complete(self, sink: Sink, job: int, proposal_type: str, post_id: int | str) -> bool:
+        """
+        Отмечает, что строки поста переданы в выходной файл. Пост считается обработанным после следующей
+        контрольной точки.
+
+        Аргументы:
+        - `sink` (Sink): выходной файл.
+        - `job` (int): номер сети в списке `jobs` цикла.
+        - `proposal_type` (str): тип поста.
+        - `post_id` (int|str): ID поста.
+
+        Возвращает:
+        `bool`: True, если пора записать контрольную точку: накопилось `CHECKPOINT_POSTS` постов
+        или прошло `CHECKPOINT_SECONDS` секунд с прошлой точки."""
+        output_pathname = sink.file_pathname
+        with self._lock:
+            pending = self._pending[output_pathname]
+            pending.append([job, proposal_type, str(post_id)])
+            return (
+                len(pending) >= CHECKPOINT_POSTS
+                or time.monotonic() - self._committed_at[output_pathname] >= CHECKPOINT_SECONDS
+            )
+
+    def commit(self, sink: Sink) -> None:
+        """
+        Сбрасывает выходной файл на диск и записывает контрольную точку.
+
+        Аргументы:
+        - `sink` (Sink): выходной файл.
+
+        Возвращает:
+        `None`"""
+        output_pathname = sink.file_pathname
+        sink.sync()
+        with self._lock:
+            units = self._pending.pop(output_pathname, [])
+            rows = sink.rows_written - self._committed_rows[output_pathname]
+            entry = {"output": output_pathname, "offset": sink.offset, "rows": rows, "units": units}
+            self._write(entry)
+            self._completed.update(tuple(unit) for unit in units)
+            self._committed_rows[output_pathname] = sink.rows_written
+            self._committed_at[output_pathname] = time.monotonic()
+
+    def finish(self, job: int, has_data: bool) -> None:
+        """
+        Отмечает завершение парсинга сети.
+
+        Аргументы:
+        - `job` (int): номер сети в списке `jobs` цикла.
+        - `has_data` (bool): были ли записаны данные сети.
+
+        Возвращает:
+        `None`"""
+        with self._lock:
+            self._write({"finished": job, "has_data": has_data})
+            self._finished[job] = has_data
+
+    def remove(self) -> None:
+        """Закрывает и удаляет журнал после успешного завершения цикла."""
+        self._file.close()
+        if os.path.exists(self.journal_pathname):
+            os.remove(self.journal_pathname)
+
+    def _write(self, entry: dict[str, Any]) -> None:
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        _sync(self._file)
+
+
+def restore_outputs(checkpoint: Checkpoint, sink_class: type[Sink]) -> None:
+    """
+    Обрезает выходные файлы прерванного цикла до размера из последней контрольной точки.
+
+    Аргументы:
+    - `checkpoint` (Checkpoint): журнал прерванного цикла.
+    - `sink_class` (type[Sink]): класс выходного файла.
+
+    Возвращает:
+    `None`"""
+    for output_pathname in {job[2] for job in checkpoint.cycle["jobs"]}:
+        if os.path.exists(output_pathname):
+            offset = checkpoint.offset(output_pathname)
+            if sink_class.truncate(output_pathname, offset):
+                logging.info(f"Выходной файл {output_pathname} обрезан до {offset} байт")
+
+
+def _sync(file: Any) -> None:
+    file.flush()
+    os.fsync(file.fileno())
@@ -1,3 +1,7 @@
+import os
+
+API_URL = os.environ.get("POLKASSEMBLY_API_URL", "https://api.polkassembly.io/api/v1").rstrip("/")
+
 URL_ENDPOINTS = {
     "discussions": "post",
     "grants": "grant",
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from collections import Counter, deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+import requests
+
+from cancellation import check_stopped
+from get_post_data import extract_post, fetch_post_data, iter_post_rows, post_state
+from metrics import metrics
+from parse_posts import is_outside_window
+from records import PostRecord
+from state_store import PostState, StateStore, date_window, listing_hash
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def ordered_map(executor: Executor, func: Callable[[T], R], items: Iterable[T], window: int) -> Iterator[R]:
+    """
+    Выполняет `func` для каждого элемента в пуле потоков и выдает результаты в порядке исходных элементов.
+
+    Одновременно в работе находится не более `window` задач, поэтому `items` может быть генератором.
+
+    Аргументы:
+    - `executor` (Executor): пул, в котором выполняются задачи.
+    - `func` (Callable): функция, применяемая к каждому элементу.
+    - `items` (Iterable): элементы для обработки.
+    - `window` (int): максимальное количество задач, поставленных в очередь.
+
+    Возвращает:
+    `Iterator`: результаты `func` в порядке элементов `items`."""
+    pending: deque[Future[R]] = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def fetch_posts_data(
+    url: str,
+    is_on: str,
+    proposal_type: str,
+    listings: Iterable[dict[str, Any]],
+    session: requests.Session,
+    concurrency: int = 8,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    network: str = "",
+    state: StateStore | None = None,
+    stats: Counter[str] | None = None,
+) -> Iterator[tuple[Any, Iterator[tuple[Any, ...]]]]:
+    """
+    Параллельно получает данные постов и комментариев для записей из списка постов.
+
+    Ответ API разбирается в потоке запроса: сохраняются только нужные поля поста и отобранные комментарии,
+    а сам ответ сразу освобождается.
+
+    Количество одновременных запросов ограничено `concurrency` для сети и общим лимитом
+    из `http_client`. Для каждого поста в порядке `listings` выдается его ID и ленивый итератор его строк;
+    итератор нужно прочитать до конца перед получением следующего.
+
+    Если передано хранилище состояния, посты, запись которых в списке не изменилась с прошлого цикла,
+    не запрашиваются, а из измененных постов выдаются только новые комментарии. Состояние, сохраненное
+    с другим периодом `start_date`/`end_date`, не учитывается: комментарии, не попавшие в прежний период,
+    еще не записаны, поэтому пост обрабатывается как новый. Состояние поста
+    добавляется в очередь хранилища; сохранить его в базу вызывающий код должен через `StateStore.commit`
+    после того, как строки поста сброшены на диск.
+
+    Посты, которые по данным из списка постов не могут попасть в период, также не запрашиваются.
+    Количество пропущенных запросов добавляется в `stats` по ключам `outside_window` и `unchanged`.
+
+    Аргументы:
+    - `url (str)`: Базовый URL адрес сайта Polkassembly.
+    - `is_on (str)`: Тип предложения (например, `"on"` или `"off"`).
+    - `proposal_type (str)`: Тип поста (например, `"proposal"` или `"referendum"`).
+    - `listings (Iterable[dict])`: Записи постов из списка постов.
+    - `session (requests.Session)`: Сессия для запросов к API.
+    - `concurrency (int)`: Максимальное количество одновременных запросов для сети. По умолчанию 8.
+    - `start_date (datetime, опционально)`: Дата начала периода, за который нужно получить данные. По умолчанию None.
+    - `end_date (datetime, опционально)`: Дата конца периода, за который нужно получить данные. По умолчанию None.
+    - `network (str)`: Название сети, используется как ключ в хранилище состояния.
+    - `state (StateStore, опционально)`: Хранилище состояния для инкрементального парсинга. По умолчанию None.
+    - `stats (Counter, опционально)`: Счетчики пропущенных запросов. По умолчанию None.
+
+    Возвращает:
+    `Iterator[tuple[Any, Iterator[tuple]]]`: ID поста и итератор строк для записи в выходной файл, по одному
+    на каждый запрошенный пост."""
+
+    if stats is None:
+        stats = Counter()
+    window = date_window(start_date, end_date)
+
+    def changed_listings() -> Iterator[tuple[dict[str, Any], str, PostState | None]]:
+        for listing in listings:
+            check_stopped()
+            if (start_date or end_date) and is_outside_window(listing, start_date, end_date):
+                stats["outside_window"] += 1
+                continue
+            content_hash = listing_hash(listing)
+            previous = state.get(network, proposal_type, listing["post_id"]) if state else None
+            if previous and previous.date_window != window:
+                previous = None
+            if previous and previous.content_hash == content_hash:
+                stats["unchanged"] += 1
+                continue
+            yield listing, content_hash, previous
+
+    def fetch(
+        item: tuple[dict[str, Any], str, PostState | None]
+    ) -> tuple[PostRecord | None, dict[str, Any], str]:
+        listing, content_hash, previous = item
+        with metrics.stage(network, proposal_type, "fetch"):
+            post_data = fetch_post_data(
+                is_on, proposal_type, listing["post_id"], session, last_comment_at=listing.get("last_comment_at")
+            )
+        if post_data is None:
+            return None, listing, content_hash
+        with metrics.stage(network, proposal_type, "build"):
+            record = extract_post(post_data, url, proposal_type, start_date, end_date, previous)
+        return record, listing, content_hash
+
+    concurrency = max(concurrency, 1)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        for record, listing, content_hash in ordered_map(executor, fetch, changed_listings(), window=concurrency * 2):
+            if record is None:
+                continue
+            if state:
+                state.update(network, proposal_type, listing["post_id"], post_state(record, content_hash, window))
+            yield listing["post_id"], iter_post_rows(record)
+    finally:
+        # При прерывании запросы постов, стоящие в очереди, отменяются, а выполняющиеся не ожидаются.
+        executor.shutdown(wait=False, cancel_futures=True)
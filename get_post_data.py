@@ -1,105 +1,254 @@
 from __future__ import annotations
 
+import json
 import logging
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterator
 
 import requests
 
-from constants import URL_ENDPOINTS
+from constants import API_URL, URL_ENDPOINTS
+from http_client import http_get
+from records import Comment, Post, PostRecord, format_timestamp, parse_timestamp
+from state_store import PostState
 
+EMPTY_COMMENT_FIELDS = (None,) * 8
 
-def get_post_and_comments_data(
-    url: str,
+
+def fetch_post_data(
     is_on: str,
     proposal_type: str,
     post_id: int | str,
     session: requests.Session,
-    start_date: datetime | None = None,
-    end_date: datetime | None = None,
-) -> list[Any]:
+    last_comment_at: str | None = None,
+) -> dict[str, Any] | None:
     """
-    Функция get_post_and_comments_data получает данные поста и комментариев по указанным параметрам.
+    Получает данные поста и его комментариев из API Polkassembly.
 
-    Аргументы:
+    Если передана дата последнего комментария из списка постов, ответ из дискового кеша, в котором нет
+    комментария с этой датой, считается устаревшим и пост запрашивается заново.
 
-    - `url (str)`: Базовый URL адрес сайта Polkassembly.
+    Аргументы:
     - `is_on (str)`: Тип предложения (например, `"on" `или `"off"`).
     - `proposal_type (str)`: Тип поста (например, `"proposal"` или `"referendum"`).
     - `post_id (int|str)`: ID поста.
     - `session (requests.Session)`: Сессия для запросов к API.
-    - `start_date (datetime, опционально)`: Дата начала периода, за который нужно получить данные. По умолчанию None.
-    - `end_date (datetime, опционально)`: Дата конца периода, за который нужно получить данные. По умолчанию None.
+    - `last_comment_at (str|None)`: Дата последнего комментария поста из списка постов. По умолчанию None.
 
     Возвращает:
-    `list`: Список данных для записи в CSV-файл."""
-    post_url = f"https://api.polkassembly.io/api/v1/posts/{is_on}-chain-post"
+    `dict | None`: Данные поста или None, если запрос не удался."""
+    post_url = f"{API_URL}/posts/{is_on}-chain-post"
     params = {"postId": post_id, "proposalType": proposal_type}
-    rows = []
 
     try:
-        response_post = session.get(post_url, params=params, timeout=20)
+        response_post = http_get(
+            session,
+            post_url,
+            params=params,
+            accept_cached=(lambda body: has_comments_until(body, last_comment_at)) if isinstance(last_comment_at, str)
+            else None,
+        )
         response_post.raise_for_status()
-        post_data = response_post.json()
-
-        post_id = post_data["post_id"] if post_data.get("post_id") else post_data.get("hash", "None")
-        post_link = f"{url}{URL_ENDPOINTS.get(proposal_type, '')}/{post_id}"
-        post_type = post_data.get("type", proposal_type.title())
-        post_title = str(post_data.get("title", "Untitled")).strip() or "Untitled"
-        post_comments = post_data.get("comments", [])
-        post_date = datetime.strptime(post_data["created_at"], "%Y-%m-%dT%H:%M:%S.%fZ")
-
-        if post_comments:
-            comments = []
-            for comment in post_comments:
-                comment_date = datetime.strptime(comment["created_at"], "%Y-%m-%dT%H:%M:%S.%fZ")
-                if (start_date and comment_date < start_date) or (end_date and comment_date > end_date):
-                    continue
-                comments.append(get_row_data(post_data, post_type, post_link, comment))
-            if comments:
-                rows.extend(comments)
-                logging.info(f"Сохранено {len(comments)} комментариев для поста [{post_title}]: {post_link}")
-        else:
-            if (start_date and post_date < start_date) or (end_date and post_date > end_date):
-                return rows
-            rows.append(get_row_data(post_data, post_type, post_link))
-            logging.info(f"Сохранен пост [{post_title}]: {post_link}")
-
+        return response_post.json()
     except requests.exceptions.ReadTimeout:
-        logging.warning(f"Таймаут при запросе к {post_url} {params} {url}")
+        logging.warning(f"Таймаут при запросе к {post_url} {params}")
     except requests.exceptions.RequestException:
         logging.exception(f"Ошибка при получении данных поста: {post_id}")
 
-    return rows
+    return None
 
 
-def get_row_data(post_data: dict, post_type: str, post_link: str, comment_data: dict | None = None) -> list[Any]:
+def has_comments_until(body: bytes, last_comment_at: str) -> bool:
     """
-    Возвращает список данных для записи в CSV-файл.
+    Проверяет, что ответ API с постом содержит комментарии или ответы не старше `last_comment_at`.
+
+    Аргументы:
+    - `body (bytes)`: Тело ответа API с постом.
+    - `last_comment_at (str)`: Дата последнего комментария в формате ISO 8601.
+
+    Возвращает:
+    `bool`: False, если в ответе нет комментария с такой или более поздней датой (с точностью до секунды)."""
+    try:
+        comments = json.loads(body).get("comments") or []
+    except (ValueError, AttributeError):
+        return False
+    newest = max((str(comment.get("created_at") or "") for comment, _, _ in iter_comment_tree(comments)), default="")
+    return newest[:19] >= last_comment_at[:19]
+
+
+def extract_post(
+    post_data: dict[str, Any],
+    url: str,
+    proposal_type: str,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+    previous: PostState | None = None,
+) -> PostRecord:
+    """
+    Извлекает из данных поста только поля, которые попадают в результаты, и отбирает комментарии и вложенные
+    ответы на них для записи.
+
+    Даты комментариев сравниваются с периодом как строки в формате API, поэтому разбираются только даты
+    отобранных комментариев. Если передано состояние поста с прошлого цикла, отбираются только комментарии
+    новее сохраненного, а пост без комментариев повторно не записывается.
+
+    Аргументы:
+    - `post_data (dict)`: Данные поста из API.
+    - `url (str)`: Базовый URL адрес сайта Polkassembly.
+    - `proposal_type (str)`: Тип поста (например, `"proposal"` или `"referendum"`).
+    - `start_date (datetime, опционально)`: Дата начала периода, за который нужно получить данные. По умолчанию None.
+    - `end_date (datetime, опционально)`: Дата конца периода, за который нужно получить данные. По умолчанию None.
+    - `previous (PostState, опционально)`: Состояние поста с прошлого цикла парсинга. По умолчанию None.
+
+    Возвращает:
+    `PostRecord`: Пост и отобранные комментарии."""
+    post_id = post_data["post_id"] if post_data.get("post_id") else post_data.get("hash", "None")
+    post_link = f"{url}{URL_ENDPOINTS.get(proposal_type, '')}/{post_id}"
+    post = get_post(post_data, post_data.get("type", proposal_type.title()), post_link)
+    post_comments = post_data.get("comments", [])
+    start = format_timestamp(start_date) if start_date else None
+    end = format_timestamp(end_date) if end_date else None
+    last_comment_at = previous.last_comment_at if previous else None
+
+    comments = []
+    newest = None
+    comments_count = 0
+    for comment, parent_id, depth in iter_comment_tree(post_comments, end):
+        created_at = comment["created_at"]
+        comments_count += 1
+        if newest is None or created_at > newest:
+            newest = created_at
+        if last_comment_at and created_at <= last_comment_at:
+            continue
+        if start and created_at < start:
+            continue
+        comments.append(get_comment(comment, parent_id, depth))
+
+    post_only = not post_comments and not (
+        previous or (start_date and post.created_at < start_date) or (end_date and post.created_at > end_date)
+    )
+    return PostRecord(post, comments, post_only, comments_count, newest)
+
+
+def iter_comment_tree(
+    comments: list[dict[str, Any]], end: str | None = None
+) -> Iterator[tuple[dict[str, Any], str | None, int]]:
+    """
+    Обходит комментарии поста и вложенные ответы (`replies`) в порядке отображения на сайте: комментарий, затем
+    ответы на него. Обход выполняется без рекурсии, поэтому глубина вложенности не ограничена, а в памяти хранится
+    только путь от комментария поста до текущего ответа.
+
+    Ответ не может быть старше комментария, на который он дан, поэтому комментарий новее `end` пропускается вместе
+    со всеми ответами на него. Ответы на комментарии старше начала периода не пропускаются: они могут быть новее.
+
+    Аргументы:
+    - `comments (list[dict])`: Комментарии поста из API.
+    - `end (str|None)`: Дата конца периода в формате API. По умолчанию None.
+
+    Возвращает:
+    `Iterator[tuple]`: Комментарий или ответ, ID комментария, на который он дан (None для комментария поста),
+    и глубина вложенности (0 для комментария поста)."""
+    stack: list[tuple[Iterator[dict[str, Any]], str | None, int]] = [(iter(comments), None, 0)]
+    while stack:
+        children, parent_id, depth = stack[-1]
+        for comment in children:
+            if end and comment["created_at"] > end:
+                continue
+            yield comment, parent_id, depth
+            replies = comment.get("replies")
+            if replies:
+                stack.append((iter(replies), _comment_id(comment), depth + 1))
+                break
+        else:
+            stack.pop()
+
+
+def iter_post_rows(record: PostRecord) -> Iterator[tuple[Any, ...]]:
+    """
+    Лениво формирует строки для записи в выходной файл из поста и его комментариев.
+
+    Аргументы:
+    - `record (PostRecord)`: Пост и отобранные комментарии.
+
+    Возвращает:
+    `Iterator[tuple]`: Строки в порядке столбцов `sinks.COLUMNS`."""
+    post = record.post
+    post_fields = post[:10]
+    for comment in record.comments:
+        yield (*post_fields, *comment, post.link)
+    if record.comments:
+        logging.info(f"Сохранено {len(record.comments)} комментариев для поста [{post.title}]: {post.link}")
+    elif record.post_only:
+        yield (*post_fields, *EMPTY_COMMENT_FIELDS, post.link)
+        logging.info(f"Сохранен пост [{post.title}]: {post.link}")
+
+
+def post_state(record: PostRecord, content_hash: str, window: str) -> PostState:
+    """
+    Возвращает состояние поста для сохранения в хранилище инкрементального парсинга.
+
+    Аргументы:
+    - `record (PostRecord)`: Пост и отобранные комментарии.
+    - `content_hash (str)`: Хеш записи поста из списка постов.
+    - `window (str)`: Период парсинга, в котором отобраны комментарии (`state_store.date_window`).
+
+    Возвращает:
+    `PostState`: Состояние поста."""
+    return PostState(record.comments_count, record.last_comment_at, content_hash, window)
+
+
+def get_post(post_data: dict, post_type: str, post_link: str) -> Post:
+    """
+    Возвращает поля поста, общие для всех строк его комментариев.
 
     Аргументы:
     - `post_data(dict)` : Словарь данных поста.
     - `post_type(str)` : Тип поста (например, "proposal" или "referendum").
     - `post_link (str)`: Ссылка на пост.
-    - `comment_data (dict | None)`: Словарь данных комментария, если есть.
 
     Возвращает:
-    `list`: Список данных для записи в CSV-файл."""
-    return [
+    `Post`: Поля поста."""
+    reactions = post_data["post_reactions"]
+    return Post(
         post_type,
         post_data["topic"]["name"],
-        post_data["created_at"][:19].replace("T", " "),
+        parse_timestamp(post_data["created_at"]),
         post_data.get("user_id"),
         post_data.get("username"),
         str(post_data.get("title", "Untitled")).strip() or "Untitled",
         post_data.get("content", "").replace("\n", " "),
         post_data.get("status"),
-        post_data["post_reactions"]["👍"]["count"],
-        post_data["post_reactions"]["👎"]["count"],
-        comment_data["content"].replace("\n", " ") if comment_data else "",
-        comment_data["username"] if comment_data else "",
-        comment_data["created_at"][:19].replace("T", " ") if comment_data else "",
-        comment_data["comment_reactions"]["👍"]["count"] if comment_data else "",
-        comment_data["comment_reactions"]["👎"]["count"] if comment_data else "",
+        reactions["👍"]["count"],
+        reactions["👎"]["count"],
         post_link,
-    ]
+    )
+
+
+def get_comment(comment_data: dict, parent_id: str | None = None, depth: int = 0) -> Comment:
+    """
+    Возвращает поля комментария или ответа.
+
+    Аргументы:
+    - `comment_data (dict)`: Словарь данных комментария или ответа.
+    - `parent_id (str|None)`: ID комментария, на который дан ответ. Для комментария поста None.
+    - `depth (int)`: Глубина вложенности ответа. Для комментария поста 0.
+
+    Возвращает:
+    `Comment`: Поля комментария."""
+    # У ответов реакции хранятся в поле reply_reactions и могут отсутствовать.
+    reactions = comment_data.get("comment_reactions") or comment_data.get("reply_reactions") or {}
+    return Comment(
+        comment_data["content"].replace("\n", " "),
+        comment_data["username"],
+        parse_timestamp(comment_data["created_at"]),
+        reactions.get("👍", {}).get("count", 0),
+        reactions.get("👎", {}).get("count", 0),
+        _comment_id(comment_data),
+        parent_id,
+        depth,
+    )
+
+
+def _comment_id(comment_data: dict) -> str | None:
+    comment_id = comment_data.get("id")
+    return None if comment_id is None else str(comment_id)
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any
+
+import requests
+
+LISTING_TTL = 5 * 60
+POST_TTL = 60 * 60
+PAGE_TTL = 60 * 60
+FINAL_POST_TTL = 24 * 60 * 60
+FINAL_STATUSES = {
+    "Approved",
+    "Awarded",
+    "Cancelled",
+    "Claimed",
+    "Closed",
+    "Executed",
+    "ExecutionFailed",
+    "Killed",
+    "NotPassed",
+    "Rejected",
+    "Retracted",
+    "TimedOut",
+    "Vetoed",
+}
+
+
+def endpoint_ttl(url: str, content: bytes) -> float:
+    """
+    Возвращает время жизни ответа в кеше в зависимости от эндпоинта.
+
+    Посты с завершенным статусом (`FINAL_STATUSES`) меняются редко и хранятся дольше остальных, но к ним
+    по-прежнему добавляются комментарии, поэтому срок жизни ограничен и для них.
+
+    Аргументы:
+    - `url` (str): URL-адрес запроса.
+    - `content` (bytes): тело ответа.
+
+    Возвращает:
+    `float`: время жизни в секундах."""
+    if "/listing/" in url:
+        return LISTING_TTL
+    if "/posts/" in url:
+        try:
+            status = json.loads(content).get("status")
+        except (ValueError, AttributeError):
+            return POST_TTL
+        return FINAL_POST_TTL if status in FINAL_STATUSES else POST_TTL
+    return PAGE_TTL
+
+
+class HttpCache:
+    """
+    Дисковый кеш HTTP-ответов с ограничением размера.
+
+    Каждый ответ хранится в двух файлах, имя которых - SHA-256 хеш сети, URL-адреса и параметров запроса:
+    тело ответа (`.body`) и метаданные (`.json`) со сроком жизни и заголовками `ETag`/`Last-Modified`.
+    Устаревшие ответы проверяются условным запросом. Если общий размер кеша превышает `max_bytes`,
+    удаляются ответы, к которым дольше всего не обращались.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._size = sum(os.path.getsize(pathname) for pathname in self._body_pathnames())
+
+    def key(self, session: requests.Session, url: str, params: dict[str, Any] | None) -> str:
+        """
+        Возвращает ключ кеша для запроса.
+
+        Аргументы:
+        - `session` (requests.Session): сессия запроса, учитывается заголовок `x-network`.
+        - `url` (str): URL-адрес запроса.
+        - `params` (dict|None): параметры запроса.
+
+        Возвращает:
+        `str`: SHA-256 хеш запроса в шестнадцатеричном виде."""
+        payload = json.dumps(
+            [session.headers.get("x-network"), url, sorted((params or {}).items())], default=str, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def load(self, key: str) -> tuple[bytes, dict[str, Any]] | None:
+        """
+        Возвращает тело и метаданные ответа из кеша.
+
+        Аргументы:
+        - `key` (str): ключ кеша.
+
+        Возвращает:
+        `tuple[bytes, dict] | None`: тело и метаданные ответа или None, если ответа нет в кеше."""
+        body_pathname, meta_pathname = self._pathnames(key)
+        try:
+            with open(meta_pathname, "r") as meta_file:
+                meta = json.load(meta_file)
+            with open(body_pathname, "rb") as body_file:
+                body = body_file.read()
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(body_pathname)
+        except OSError:
+            pass
+        return body, meta
+
+    @staticmethod
+    def is_fresh(meta: dict[str, Any]) -> bool:
+        """Проверяет, что срок жизни ответа в кеше не истек."""
+        return meta["expires_at"] > time.time()
+
+    @staticmethod
+    def validators(meta: dict[str, Any]) -> dict[str, str]:
+        """Возвращает заголовки условного запроса для проверки устаревшего ответа."""
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def store(self, key: str, response: requests.Response) -> None:
+        """
+        Сохраняет успешный ответ в кеш и удаляет старые ответы, если кеш превысил допустимый размер.
+
+        Аргументы:
+        - `key` (str): ключ кеша.
+        - `response` (requests.Response): ответ сервера со статусом 200.
+
+        Возвращает:
+        `None`"""
+        body = response.content
+        ttl = endpoint_ttl(response.url, body)
+        meta = {
+            "url": response.url,
+            "expires_at": time.time() + ttl,
+            "ttl": ttl,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "encoding": response.encoding,
+            "content_type": response.headers.get("Content-Type"),
+        }
+        body_pathname, meta_pathname = self._pathnames(key)
+        os.makedirs(os.path.dirname(body_pathname), exist_ok=True)
+        previous_size = os.path.getsize(body_pathname) if os.path.exists(body_pathname) else 0
+        self._write_atomic(body_pathname, body)
+        self._write_atomic(meta_pathname, json.dumps(meta).encode())
+        with self._lock:
+            self._size += len(body) - previous_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def refresh(self, key: str, meta: dict[str, Any]) -> None:
+        """
+        Продлевает срок жизни ответа после того, как сервер подтвердил его актуальность (HTTP 304).
+
+        Аргументы:
+        - `key` (str): ключ кеша.
+        - `meta` (dict): метаданные ответа.
+
+        Возвращает:
+        `None`"""
+        if meta.get("ttl") is not None:
+            meta["expires_at"] = time.time() + meta["ttl"]
+        self._write_atomic(self._pathnames(key)[1], json.dumps(meta).encode())
+
+    @staticmethod
+    def to_response(body: bytes, meta: dict[str, Any]) -> requests.Response:
+        """
+        Собирает объект ответа из данных кеша.
+
+        Аргументы:
+        - `body` (bytes): тело ответа.
+        - `meta` (dict): метаданные ответа.
+
+        Возвращает:
+        `requests.Response`: ответ со статусом 200."""
+        response = requests.Response()
+        response.status_code = 200
+        response.url = meta.get("url", "")
+        response.encoding = meta.get("encoding")
+        if meta.get("content_type"):
+            response.headers["Content-Type"] = meta["content_type"]
+        response._content = body
+        response._content_consumed = True
+        return response
+
+    def record(self, counter: str) -> None:
+        """
+        Увеличивает счетчик кеша.
+
+        Аргументы:
+        - `counter` (str): название счетчика: `hits`, `misses` или `revalidated`.
+
+        Возвращает:
+        `None`"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def log_stats(self) -> None:
+        """Выводит в лог количество попаданий и промахов кеша."""
+        logging.info(
+            f"Кеш HTTP: попаданий {self.hits}, промахов {self.misses}, подтверждено сервером {self.revalidated}, "
+            f"размер {self._size / 1024 / 1024:.1f} МБ"
+        )
+
+    def _pathnames(self, key: str) -> tuple[str, str]:
+        directory = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(directory, f"{key}.body"), os.path.join(directory, f"{key}.json")
+
+    def _body_pathnames(self) -> list[str]:
+        return [
+            entry.path
+            for directory in os.scandir(self.cache_dir)
+            if directory.is_dir()
+            for entry in os.scandir(directory.path)
+            if entry.name.endswith(".body")
+        ]
+
+    def _evict(self) -> None:
+        target = self.max_bytes * 0.9
+        entries = []
+        for pathname in self._body_pathnames():
+            try:
+                stat = os.stat(pathname)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, pathname))
+        for _, size, pathname in sorted(entries):
+            if self._size <= target:
+                break
+            for stale_pathname in (pathname, pathname[: -len(".body")] + ".json"):
+                try:
+                    os.remove(stale_pathname)
+                except OSError:
+                    pass
+            self._size -= size
+        logging.debug(f"Кеш HTTP очищен до {self._size / 1024 / 1024:.1f} МБ")
+
+    @staticmethod
+    def _write_atomic(pathname: str, data: bytes) -> None:
+        temp_pathname = f"{pathname}.{threading.get_ident()}.tmp"
+        with open(temp_pathname, "wb") as temp_file:
+            temp_file.write(data)
+        os.replace(temp_pathname, pathname)
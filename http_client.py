@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cancellation import check_stopped, stop_requested
+from http_cache import HttpCache
+from metrics import endpoint_name, metrics
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 60.0
+
+
+class AdaptiveLimiter:
+    """
+    Ограничитель одновременных запросов с адаптивным лимитом (AIMD).
+
+    После каждых `limit` успешных ответов подряд лимит увеличивается на единицу, но не выше `max_limit`.
+    Если сервер ограничивает запросы (HTTP 429 или 503), лимит уменьшается вдвое, но не ниже `min_limit`.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1) -> None:
+        self.max_limit = max(max_limit, 1)
+        self.min_limit = max(min(min_limit, self.max_limit), 1)
+        self.limit = self.max_limit
+        self._active = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Ожидает, пока количество выполняющихся запросов не станет меньше текущего лимита."""
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+
+    def release(self, throttled: bool = False) -> None:
+        """
+        Освобождает место для следующего запроса и пересчитывает лимит.
+
+        Аргументы:
+        - `throttled` (bool): True, если сервер ответил, что запросов слишком много.
+
+        Возвращает:
+        `None`"""
+        with self._condition:
+            self._active -= 1
+            if throttled:
+                self._successes = 0
+                if self.limit > self.min_limit:
+                    self.limit = max(self.limit // 2, self.min_limit)
+                    logging.info(f"Сервер ограничивает запросы, лимит одновременных запросов снижен до {self.limit}")
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self._successes = 0
+                    self.limit += 1
+            self._condition.notify_all()
+
+
+_limiter = AdaptiveLimiter(16)
+_max_retries = 3
+_cache: HttpCache | None = None
+
+
+def configure(max_concurrency: int = 16, max_retries: int = 3, cache: HttpCache | None = None) -> None:
+    """
+    Устанавливает общие для всех сетей параметры HTTP-запросов.
+
+    Аргументы:
+    - `max_concurrency` (int): максимальное количество одновременных запросов. По умолчанию 16.
+    - `max_retries` (int): количество повторов неудачного запроса. По умолчанию 3.
+    - `cache` (HttpCache|None): дисковый кеш ответов. По умолчанию None.
+
+    Возвращает:
+    `None`"""
+    global _limiter, _max_retries, _cache
+    _limiter = AdaptiveLimiter(max_concurrency)
+    _max_retries = max(max_retries, 0)
+    _cache = cache
+
+
+def create_session(network: str, pool_size: int = 8) -> requests.Session:
+    """
+    Создает сессию для запросов к сайту и API Polkassembly.
+
+    Аргументы:
+    - `network` (str): название сети, передается в заголовке `x-network`.
+    - `pool_size` (int): максимальное количество соединений с одним хостом. По умолчанию 8.
+
+    Возвращает:
+    `requests.Session`: настроенная сессия."""
+    session = requests.Session()
+    session.headers.update({"x-network": network, "Accept": "application/json"})
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(pool_size, 1))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def http_get(
+    session: requests.Session,
+    url: str,
+    params: dict[str, Any] | None = None,
+    timeout: float = 20,
+    accept_cached: Callable[[bytes], bool] | None = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """
+    Выполняет GET-запрос с повторами и учетом ограничений сервера.
+
+    Таймауты, ошибки соединения и ответы со статусами из `RETRY_STATUSES` повторяются с экспоненциальной
+    задержкой со случайным разбросом. Если сервер прислал заголовок `Retry-After`, используется его значение.
+    Количество одновременных запросов ограничивается общим адаптивным лимитом. Если настроен дисковый кеш,
+    актуальные ответы берутся из него, а устаревшие проверяются условным запросом.
+
+    Аргументы:
+    - `session` (requests.Session): сессия для запроса.
+    - `url` (str): URL-адрес запроса.
+    - `params` (dict|None): параметры запроса. По умолчанию None.
+    - `timeout` (float): таймаут запроса в секундах. По умолчанию 20.
+    - `accept_cached` (Callable|None): проверка тела ответа из кеша. Если она возвращает False, ответ из кеша
+      не используется и запрашивается заново без условного запроса. По умолчанию None.
+    - `**kwargs`: дополнительные аргументы для `session.get`.
+
+    Возвращает:
+    `requests.Response`: ответ сервера. Ответ с ошибкой возвращается после последнего повтора.
+
+    Исключения:
+    - `requests.exceptions.RequestException`: если запрос не удался после всех повторов."""
+    cache = _cache
+    if cache is None:
+        return _get_with_retries(session, url, params, timeout, **kwargs)
+
+    key = cache.key(session, url, params)
+    cached = cache.load(key)
+    if cached and accept_cached and not accept_cached(cached[0]):
+        cached = None
+    if cached and cache.is_fresh(cached[1]):
+        cache.record("hits")
+        return cache.to_response(*cached)
+
+    if cached:
+        kwargs["headers"] = {**kwargs.get("headers", {}), **cache.validators(cached[1])}
+    response = _get_with_retries(session, url, params, timeout, **kwargs)
+    if response.status_code == 304 and cached:
+        cache.record("revalidated")
+        cache.refresh(key, cached[1])
+        return cache.to_response(*cached)
+
+    cache.record("misses")
+    if response.status_code == 200:
+        cache.store(key, response)
+    return response
+
+
+def _get_with_retries(
+    session: requests.Session, url: str, params: dict[str, Any] | None, timeout: float, **kwargs: Any
+) -> requests.Response:
+    limiter = _limiter
+    endpoint = endpoint_name(url)
+    attempt = 0
+    while True:
+        check_stopped()
+        limiter.acquire()
+        throttled = False
+        started = time.perf_counter()
+        try:
+            response = session.get(url, params=params, timeout=timeout, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if isinstance(e, requests.exceptions.Timeout):
+                metrics.observe_timeout(endpoint)
+            else:
+                metrics.observe_error(endpoint)
+            if attempt >= _max_retries:
+                raise
+            metrics.observe_retry(endpoint)
+            delay = backoff_delay(attempt)
+            logging.debug(f"Повтор запроса к {url} {params} через {delay:.1f} с: {e}")
+        else:
+            metrics.observe_response(endpoint, response.status_code, time.perf_counter() - started)
+            throttled = response.status_code in THROTTLE_STATUSES
+            if response.status_code not in RETRY_STATUSES or attempt >= _max_retries:
+                return response
+            metrics.observe_retry(endpoint)
+            delay = retry_after_delay(response) or backoff_delay(attempt)
+            logging.debug(f"Повтор запроса к {url} {params} через {delay:.1f} с: HTTP {response.status_code}")
+            response.close()
+        finally:
+            limiter.release(throttled)
+        # Ожидание перед повтором прерывается при остановке программы.
+        stop_requested.wait(delay)
+        attempt += 1
+
+
+def backoff_delay(attempt: int) -> float:
+    """
+    Возвращает задержку перед повтором запроса: экспоненциальную, со случайным разбросом.
+
+    Аргументы:
+    - `attempt` (int): номер неудачной попытки, начиная с 0.
+
+    Возвращает:
+    `float`: задержка в секундах."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def retry_after_delay(response: requests.Response) -> float | None:
+    """
+    Возвращает задержку из заголовка `Retry-After`, если он есть.
+
+    Аргументы:
+    - `response` (requests.Response): ответ сервера.
+
+    Возвращает:
+    `float | None`: задержка в секундах, не больше `BACKOFF_MAX`, или None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(delay, 0), BACKOFF_MAX)
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, TypeVar
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+T = TypeVar("T")
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Возвращает название вида запроса для меток метрик: `listing` - список постов, `post` - пост,
+    `page` - страница сайта.
+
+    Аргументы:
+    - `url` (str): URL-адрес запроса.
+
+    Возвращает:
+    `str`: название вида запроса."""
+    if "/listing/" in url:
+        return "listing"
+    if "/posts/" in url:
+        return "post"
+    return "page"
+
+
+class Metrics:
+    """
+    Счетчики и таймеры парсинга, накопленные с момента запуска программы.
+
+    Этапы (`topics` - получение топиков, `listing` - список постов, `fetch` - запросы постов, `build` - разбор
+    постов, `write` - запись строк) учитываются по сети и топику. Для этапов `fetch` и `build`, которые выполняются
+    параллельно, время суммируется по всем потокам и может превышать время парсинга сети. HTTP-ответы
+    учитываются по виду запроса и статусу, время ответа - гистограммой с границами `LATENCY_BUCKETS`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.stage_seconds: Counter[tuple[str, str, str]] = Counter()
+        self.stage_calls: Counter[tuple[str, str, str]] = Counter()
+        self.responses: Counter[tuple[str, str]] = Counter()
+        self.retries: Counter[str] = Counter()
+        self.timeouts: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        self.latency_buckets: dict[str, list[int]] = {}
+        self.latency_sum: Counter[str] = Counter()
+        self.rows: Counter[str] = Counter()
+        self.cycles = 0
+        self.last_cycle_seconds: float | None = None
+
+    def add_stage(self, network: str, topic: str, stage: str, seconds: float) -> None:
+        """Добавляет время выполнения этапа."""
+        key = (network, topic, stage)
+        with self._lock:
+            self.stage_seconds[key] += seconds
+            self.stage_calls[key] += 1
+
+    @contextmanager
+    def stage(self, network: str, topic: str, stage: str) -> Iterator[None]:
+        """Измеряет время выполнения блока `with` как время этапа."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(network, topic, stage, time.perf_counter() - started)
+
+    def timed(self, items: Iterable[T], network: str, topic: str, stage: str) -> Iterator[T]:
+        """
+        Выдает элементы `items`, учитывая время получения каждого элемента как время этапа.
+
+        Аргументы:
+        - `items` (Iterable): элементы, например ленивый список постов.
+        - `network` (str): название сети.
+        - `topic` (str): тип поста.
+        - `stage` (str): название этапа.
+
+        Возвращает:
+        `Iterator`: те же элементы."""
+        iterator = iter(items)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add_stage(network, topic, stage, time.perf_counter() - started)
+            yield item
+
+    def observe_response(self, endpoint: str, status: int, seconds: float) -> None:
+        """Учитывает HTTP-ответ и время его получения."""
+        with self._lock:
+            self.responses[(endpoint, str(status))] += 1
+            buckets = self.latency_buckets.setdefault(endpoint, [0] * (len(LATENCY_BUCKETS) + 1))
+            buckets[next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), -1)] += 1
+            self.latency_sum[endpoint] += seconds
+
+    def observe_retry(self, endpoint: str) -> None:
+        with self._lock:
+            self.retries[endpoint] += 1
+
+    def observe_timeout(self, endpoint: str) -> None:
+        with self._lock:
+            self.timeouts[endpoint] += 1
+
+    def observe_error(self, endpoint: str) -> None:
+        with self._lock:
+            self.errors[endpoint] += 1
+
+    def add_rows(self, network: str, rows: int) -> None:
+        with self._lock:
+            self.rows[network] += rows
+
+    def end_cycle(self, seconds: float) -> None:
+        with self._lock:
+            self.cycles += 1
+            self.last_cycle_seconds = seconds
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Возвращает метрики в виде словаря для сохранения в JSON.
+
+        Возвращает:
+        `dict`: метрики этапов, HTTP-запросов и количество строк по сетям."""
+        with self._lock:
+            http: dict[str, dict[str, Any]] = {}
+            endpoints = {endpoint for endpoint, _ in self.responses} | {*self.retries, *self.timeouts, *self.errors}
+            for endpoint in sorted(endpoints):
+                buckets = self.latency_buckets.get(endpoint, [0] * (len(LATENCY_BUCKETS) + 1))
+                http[endpoint] = {
+                    "responses": {
+                        status: count for (name, status), count in sorted(self.responses.items()) if name == endpoint
+                    },
+                    "retries": self.retries[endpoint],
+                    "timeouts": self.timeouts[endpoint],
+                    "errors": self.errors[endpoint],
+                    "latency": {
+                        "count": sum(buckets),
+                        "sum_seconds": round(self.latency_sum[endpoint], 6),
+                        "buckets": {str(bound): count for bound, count in zip([*LATENCY_BUCKETS, "+Inf"], buckets)},
+                    },
+                }
+            return {
+                "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "cycles": self.cycles,
+                "last_cycle_seconds": self.last_cycle_seconds,
+                "stages": [
+                    {
+                        "network": network,
+                        "topic": topic,
+                        "stage": stage,
+                        "seconds": round(seconds, 6),
+                        "calls": self.stage_calls[(network, topic, stage)],
+                    }
+                    for (network, topic, stage), seconds in sorted(self.stage_seconds.items())
+                ],
+                "http": http,
+                "rows": dict(sorted(self.rows.items())),
+            }
+
+    def prometheus(self) -> str:
+        """
+        Возвращает метрики в текстовом формате Prometheus.
+
+        Возвращает:
+        `str`: метрики в формате `text/plain; version=0.0.4`."""
+        snapshot = self.snapshot()
+        lines = [
+            "# TYPE polkassembly_cycles_total counter",
+            f"polkassembly_cycles_total {snapshot['cycles']}",
+        ]
+        if snapshot["last_cycle_seconds"] is not None:
+            lines += [
+                "# TYPE polkassembly_last_cycle_seconds gauge",
+                f"polkassembly_last_cycle_seconds {snapshot['last_cycle_seconds']}",
+            ]
+        lines.append("# TYPE polkassembly_stage_seconds_total counter")
+        for stage in snapshot["stages"]:
+            labels = _labels(network=stage["network"], topic=stage["topic"], stage=stage["stage"])
+            lines.append(f"polkassembly_stage_seconds_total{labels} {stage['seconds']}")
+        lines.append("# TYPE polkassembly_stage_calls_total counter")
+        for stage in snapshot["stages"]:
+            labels = _labels(network=stage["network"], topic=stage["topic"], stage=stage["stage"])
+            lines.append(f"polkassembly_stage_calls_total{labels} {stage['calls']}")
+        lines.append("# TYPE polkassembly_http_responses_total counter")
+        for endpoint, values in snapshot["http"].items():
+            for status, count in values["responses"].items():
+                lines.append(f"polkassembly_http_responses_total{_labels(endpoint=endpoint, status=status)} {count}")
+        for name in ("retries", "timeouts", "errors"):
+            lines.append(f"# TYPE polkassembly_http_{name}_total counter")
+            for endpoint, values in snapshot["http"].items():
+                lines.append(f"polkassembly_http_{name}_total{_labels(endpoint=endpoint)} {values[name]}")
+        lines.append("# TYPE polkassembly_http_request_duration_seconds histogram")
+        for endpoint, values in snapshot["http"].items():
+            latency = values["latency"]
+            cumulative = 0
+            for bound, count in latency["buckets"].items():
+                cumulative += count
+                labels = _labels(endpoint=endpoint, le=bound)
+                lines.append(f"polkassembly_http_request_duration_seconds_bucket{labels} {cumulative}")
+            labels = _labels(endpoint=endpoint)
+            lines.append(f"polkassembly_http_request_duration_seconds_sum{labels} {latency['sum_seconds']}")
+            lines.append(f"polkassembly_http_request_duration_seconds_count{labels} {latency['count']}")
+        lines.append("# TYPE polkassembly_rows_total counter")
+        for network, rows in snapshot["rows"].items():
+            lines.append(f"polkassembly_rows_total{_labels(network=network)} {rows}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, pathname: str) -> None:
+        """
+        Сохраняет метрики в JSON-файл. Файл заменяется целиком, поэтому читатель не увидит его недописанным.
+
+        Аргументы:
+        - `pathname` (str): путь к файлу метрик.
+
+        Возвращает:
+        `None`"""
+        directory = os.path.dirname(os.path.abspath(pathname))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_pathname = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp:
+                json.dump(self.snapshot(), tmp, ensure_ascii=False, indent=2)
+            os.replace(tmp_pathname, pathname)
+        except BaseException:
+            if os.path.exists(tmp_pathname):
+                os.remove(tmp_pathname)
+            raise
+
+
+metrics = Metrics()
+
+
+def serve_prometheus(port: int, host: str = "") -> ThreadingHTTPServer:
+    """
+    Запускает в фоновом потоке HTTP-сервер, который отдает метрики в формате Prometheus по адресу `/metrics`.
+
+    Аргументы:
+    - `port` (int): порт сервера.
+    - `host` (str): адрес сервера. По умолчанию все адреса.
+
+    Возвращает:
+    `ThreadingHTTPServer`: запущенный сервер."""
+    # http.server импортируется только при запуске сервера, чтобы не замедлять запуск программы без него.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+def _labels(**labels: str) -> str:
+    values = ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return f"{{{values}}}"
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -1,13 +1,33 @@
 from __future__ import annotations
 
 import logging
+import math
+from datetime import datetime
+from typing import Any, Iterator
 
 import requests
 
+from constants import API_URL
+from http_client import http_get
 
-def parse_posts(url: str, topic_type: str, count_posts: int, is_on: str, session: requests.Session) -> list[str]:
+
+def parse_post_listings(
+    url: str,
+    topic_type: str,
+    count_posts: int,
+    is_on: str,
+    session: requests.Session,
+    page_size: int = 100,
+    start_date: datetime | None = None,
+    end_date: datetime | None = None,
+) -> Iterator[dict[str, Any]]:
     """
-    Получает список идентификаторов постов из API Polkassembly для указанной темы.
+    Постранично получает записи постов из API Polkassembly для указанной темы.
+
+    Записи выдаются по мере загрузки страниц. Если задан период, посты запрашиваются в порядке, в котором
+    за пределами периода остаются только последние страницы, и загрузка страниц прекращается, как только
+    последняя запись страницы выходит за период: при `start_date` посты сортируются по последней активности
+    (`commented`), при одной `end_date` - от старых к новым (`oldest`).
 
     Аргументы:
     - `url` (str): URL-адрес API Polkassembly.
@@ -15,21 +35,105 @@ def parse_posts(url: str, topic_type: str, count_posts: int, is_on: str, session
     - `count_posts` (int): Количество постов для получения.
     - `is_on` (str): Тип предложения (например, "on" или "off").
     - `session` (requests.Session): Объект сессии для выполнения HTTP-запросов.
+    - `page_size` (int): Количество постов на одной странице. По умолчанию 100.
+    - `start_date` (datetime|None): Дата начала периода. По умолчанию None.
+    - `end_date` (datetime|None): Дата окончания периода. По умолчанию None.
 
     Возвращает:
-    `list[str]`: Список идентификаторов постов.
+    `Iterator[dict]`: Записи постов, каждая запись содержит как минимум `post_id`.
     """
     logging.info(f"Парсинг постов для темы [{topic_type}]")
 
-    posts_url = f"https://api.polkassembly.io/api/v1/listing/{is_on}-chain-posts"
-    params = {"page": 1, "listingLimit": count_posts, "proposalType": topic_type}
-    try:
-        response = session.get(posts_url, params=params, timeout=20)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Не удалось выполнить запрос к URL: {url}: {e}")
-        return []
+    posts_url = f"{API_URL}/listing/{is_on}-chain-posts"
+    page_size = max(page_size, 1)
+    params: dict[str, Any] = {"listingLimit": page_size, "proposalType": topic_type}
+    if start_date:
+        params["sortBy"] = "commented"
+    elif end_date:
+        params["sortBy"] = "oldest"
+
+    for page in range(1, max(math.ceil(count_posts / page_size), 1) + 1):
+        params["page"] = page
+        try:
+            response = http_get(session, posts_url, params=params)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Не удалось выполнить запрос к URL: {url}: {e}")
+            return
+
+        posts = response.json()["posts"]
+        yield from posts
+
+        if len(posts) < page_size:
+            return
+        if is_past_window(posts[-1], start_date, end_date):
+            logging.debug(f"[{topic_type}] Посты после страницы {page} находятся за пределами периода")
+            return
+
+
+def is_past_window(listing: dict[str, Any], start_date: datetime | None, end_date: datetime | None) -> bool:
+    """
+    Проверяет, что запись поста и все следующие за ней записи в выбранной сортировке находятся за пределами периода.
+
+    Аргументы:
+    - `listing` (dict): Запись поста из списка постов.
+    - `start_date` (datetime|None): Дата начала периода.
+    - `end_date` (datetime|None): Дата окончания периода.
+
+    Возвращает:
+    `bool`: True, если загрузку следующих страниц можно прекратить.
+    """
+    if start_date:
+        last_comment_at = parse_listing_date(listing.get("last_comment_at"))
+        return bool(last_comment_at and last_comment_at < start_date)
+    if end_date:
+        created_at = parse_listing_date(listing.get("created_at"))
+        return bool(created_at and created_at > end_date)
+    return False
+
+
+def is_outside_window(listing: dict[str, Any], start_date: datetime | None, end_date: datetime | None) -> bool:
+    """
+    Проверяет по записи из списка постов, что пост не может содержать ни комментариев, ни самого поста за период.
+
+    Комментарии не могут быть старше поста, поэтому пост, созданный после `end_date`, пропускается. Пост,
+    созданный до `start_date`, пропускается, если у него нет комментариев или его последний комментарий
+    также оставлен до `start_date`.
+
+    Аргументы:
+    - `listing` (dict): Запись поста из списка постов.
+    - `start_date` (datetime|None): Дата начала периода.
+    - `end_date` (datetime|None): Дата окончания периода.
+
+    Возвращает:
+    `bool`: True, если запрос данных поста можно не выполнять.
+    """
+    created_at = parse_listing_date(listing.get("created_at"))
+    if not created_at:
+        return False
+    if end_date and created_at > end_date:
+        return True
+    if start_date and created_at < start_date:
+        if listing.get("comments_count") == 0:
+            return True
+        last_comment_at = parse_listing_date(listing.get("last_comment_at"))
+        return bool(last_comment_at and last_comment_at < start_date)
+    return False
 
-    posts = response.json()["posts"]
 
-    return [post["post_id"] for post in posts]
+def parse_listing_date(value: Any) -> datetime | None:
+    """
+    Преобразует дату из записи поста в `datetime`.
+
+    Аргументы:
+    - `value` (Any): Дата в формате ISO 8601 (например, "2023-05-01T10:00:00.000Z") или None.
+
+    Возвращает:
+    `datetime | None`: Дата без часового пояса или None, если дату не удалось разобрать.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value[:19])
+    except ValueError:
+        return None
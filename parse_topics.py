@@ -2,16 +2,24 @@ from __future__ import annotations
 
 import json
 import logging
-from typing import Any
+from typing import Any, Iterable
 
 import requests
-from bs4 import BeautifulSoup as bs
+
+from http_client import http_get
+
+NEXT_DATA_ID = b'id="__NEXT_DATA__"'
+SCRIPT_END = b"</script>"
+CHUNK_SIZE = 64 * 1024
 
 
 def parse_topics(url: str, session: requests.Session, limit: int | None = None) -> dict[Any, Any]:
     """
     Получает список топиков для заданного URL.
 
+    Страница загружается потоком только до конца скрипта `__NEXT_DATA__`, который находится поиском по байтам
+    без построения DOM-дерева. Если скрипт не удалось найти или разобрать, страница разбирается BeautifulSoup.
+
     Аргументы:
     - `url` (str): URL, для которого необходимо получить список топиков
     - `session` (requests.Session): объект сессии requests для отправки запросов
@@ -22,22 +30,26 @@ def parse_topics(url: str, session: requests.Session, limit: int | None = None)
     Если не удалось получить список топиков, возвращает пустой словарь."""
     logging.info(f"Получение топиков для URL: {url}")
     try:
-        response = session.get(url, timeout=20)
+        response = http_get(session, url, stream=True)
         response.raise_for_status()
+        with response:
+            page, script = scan_next_data(response.iter_content(CHUNK_SIZE))
     except requests.exceptions.RequestException as e:
         logging.error(f"Не удалось выполнить запрос к URL: {url}: {e}")
         return {}
 
-    soup = bs(response.text, "lxml")
-    categories = soup.find("script", {"id": "__NEXT_DATA__"})
-    if categories:
-        data = json.loads(categories.text)
+    data = None
+    if script is not None:
         try:
-            topics = {
-                title: topic["data"]["count"]
-                for title, topic in data["props"]["pageProps"]["latestPosts"].items()
-                if isinstance(topic, dict) and topic["data"]["count"] != 0 and title != "all"
-            }
+            data = json.loads(script)
+        except ValueError:
+            logging.debug(f"Не удалось разобрать __NEXT_DATA__ без парсера HTML для URL: {url}")
+    if data is None:
+        data = parse_next_data_html(page)
+
+    if data:
+        try:
+            topics = count_topics(data)
         except KeyError as e:
             logging.warning(f"Не удалось получить список топиков для URL: {url} KeyError: {e}")
             return {}
@@ -48,3 +60,73 @@ def parse_topics(url: str, session: requests.Session, limit: int | None = None)
 
     logging.warning(f"Не удалось получить список топиков для URL: {url}")
     return {}
+
+
+def scan_next_data(chunks: Iterable[bytes]) -> tuple[bytes, bytes | None]:
+    """
+    Читает страницу по частям до конца скрипта `__NEXT_DATA__` и возвращает его содержимое.
+
+    Аргументы:
+    - `chunks` (Iterable[bytes]): части тела ответа.
+
+    Возвращает:
+    `tuple[bytes, bytes | None]`: прочитанная часть страницы и содержимое скрипта или None, если скрипт не найден.
+    """
+    buffer = bytearray()
+    id_position = content_start = -1
+    for chunk in chunks:
+        search_from = max(len(buffer) - len(SCRIPT_END), 0)
+        buffer += chunk
+        if id_position < 0:
+            id_position = buffer.find(NEXT_DATA_ID, max(search_from - len(NEXT_DATA_ID), 0))
+            if id_position < 0:
+                continue
+        if content_start < 0:
+            tag_end = buffer.find(b">", id_position)
+            if tag_end < 0:
+                continue
+            content_start = search_from = tag_end + 1
+        content_end = buffer.find(SCRIPT_END, max(search_from, content_start))
+        if content_end >= 0:
+            return bytes(buffer), bytes(buffer[content_start:content_end])
+    return bytes(buffer), None
+
+
+def parse_next_data_html(html: bytes | str) -> dict[str, Any] | None:
+    """
+    Извлекает данные `__NEXT_DATA__` из HTML-страницы с помощью BeautifulSoup.
+
+    Аргументы:
+    - `html` (bytes|str): HTML-код страницы.
+
+    Возвращает:
+    `dict | None`: данные страницы или None, если скрипт не найден или не разобран."""
+    from bs4 import BeautifulSoup as bs
+
+    soup = bs(html, "lxml")
+    categories = soup.find("script", {"id": "__NEXT_DATA__"})
+    if not categories:
+        return None
+    try:
+        return json.loads(categories.text)
+    except ValueError:
+        return None
+
+
+def count_topics(data: dict[str, Any]) -> dict[str, int]:
+    """
+    Возвращает количество постов в каждом непустом топике из данных `__NEXT_DATA__`.
+
+    Аргументы:
+    - `data` (dict): данные страницы.
+
+    Возвращает:
+    `dict[str, int]`: количество постов по названиям топиков.
+
+    Исключения:
+    - `KeyError`: если в данных нет ожидаемых полей."""
+    return {
+        title: topic["data"]["count"]
+        for title, topic in data["props"]["pageProps"]["latestPosts"].items()
+        if isinstance(topic, dict) and topic["data"]["count"] != 0 and title != "all"
+    }
@@ -1,35 +1,57 @@
 from __future__ import annotations
 
-import csv
 import logging
-import os
+import time
+from collections import Counter
 from datetime import datetime
+from typing import Any, Iterable, Iterator
 
-import requests
-
-from get_post_data import get_post_and_comments_data
-from parse_posts import parse_posts
+from cancellation import check_stopped
+from checkpoint import Checkpoint
+from fetch_posts import fetch_posts_data
+from http_client import create_session
+from metrics import metrics
+from parse_posts import parse_post_listings
 from parse_topics import parse_topics
+from sinks import Sink
+from state_store import StateStore
 
 
 def process_url(
     url: str,
     network: str,
-    file_pathname: str,
+    sink: Sink,
     start_date: datetime | None = None,
     end_date: datetime | None = None,
+    concurrency: int = 8,
+    state: StateStore | None = None,
+    page_size: int = 100,
+    stats: Counter[str] | None = None,
+    checkpoint: Checkpoint | None = None,
+    job: int = 0,
 ) -> bool:
     """
-    Запускает парсинг постов и комментариев с заданного URL-адреса и сохраняет результат в CSV-файл.
+    Запускает парсинг постов и комментариев с заданного URL-адреса и сохраняет результат в выходной файл.
 
     Аргументы:
     - `url (str)`: URL-адрес, с которого нужно начать парсинг.
     - `network (str)`: название сети, для которой выполняется парсинг.
-    - `file_pathname (str)`: путь к файлу, в который будут сохранены результаты парсинга.
+    - `sink (Sink)`: открытый выходной файл, в который будут сохранены результаты парсинга.
     - `start_date (datetime, опционально)`: ограничение даты начала периода парсинга, только посты, созданные после
       этой даты, будут включены в результат. Если не указана, то не будет использоваться.
     - `end_date (datetime, опционально)`: ограничение даты конца периода парсинга, только посты, созданные до этой
       даты, будут включены в результат. Если не указана, то не будет использоваться.
+    - `concurrency (int)`: максимальное количество одновременных запросов постов для сети. По умолчанию 8.
+    - `state (StateStore, опционально)`: хранилище состояния для инкрементального парсинга. Если указано, сохраняются
+      только новые комментарии изменившихся постов.
+    - `page_size (int)`: количество постов на одной странице списка постов. По умолчанию 100.
+    - `stats (Counter, опционально)`: счетчики сети: `rows` - записанные строки и пропущенные запросы постов:
+      `outside_window` - посты за пределами периода, `unchanged` - посты без изменений с прошлого цикла,
+      `completed` - посты, обработанные до перезапуска.
+    - `checkpoint (Checkpoint, опционально)`: журнал контрольных точек. Если указан, посты, обработанные
+      до перезапуска, пропускаются, а обработанные посты периодически записываются в журнал.
+    - `job (int)`: номер сети в списке `jobs` цикла, под которым ее посты записываются в журнал контрольных точек.
+      По умолчанию 0.
 
     Возвращает:
     `bool`: `True`, если были получены данные и сохранены в файл, `False` в противном случае.
@@ -37,58 +59,108 @@ def process_url(
     Исключения:
     - Exception: если не удалось выполнить запрос к URL.
     """
-    has_data = False
-    with requests.Session() as session:
-        session.headers.update({"x-network": network, "Accept": "application/json"})
-        topics = parse_topics(url, session=session)
+    if stats is None:
+        stats = Counter()
+
+    # Кроме `concurrency` запросов постов, поток сети одновременно загружает следующую страницу списка постов.
+    with create_session(network, pool_size=concurrency + 1) as session:
+        with metrics.stage(network, "", "topics"):
+            topics = parse_topics(url, session=session)
         if not topics:
-            return has_data
-        with open(file_pathname, mode="a", newline="") as file:
-            writer = csv.writer(file, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL)
-            if not os.path.exists(file_pathname) or os.path.getsize(file_pathname) == 0:
-                writer.writerow(
-                    [
-                        "Post type",
-                        "Topic",
-                        "Created at",
-                        "User ID",
-                        "Username",
-                        "Post title",
-                        "Post content",
-                        "Status",
-                        "Likes",
-                        "Dislikes",
-                        "Comment content",
-                        "Comment username",
-                        "Comment created at",
-                        "Comment likes",
-                        "Comment dislikes",
-                        "Post link",
-                    ]
-                )
-            for topic_type, count_posts in topics.items():
-                is_on = "off" if topic_type in ["discussions", "grants"] else "on"
-                posts = parse_posts(
-                    url=url,
-                    topic_type=topic_type,
-                    count_posts=count_posts,
-                    is_on=is_on,
-                    session=session,
-                )
-                logging.info(f"[{topic_type}] Количество постов: {count_posts}")
-                for post_id in posts:
-                    rows = get_post_and_comments_data(
-                        url=url,
-                        is_on=is_on,
-                        proposal_type=topic_type,
-                        post_id=post_id,
-                        session=session,
-                        start_date=start_date,
-                        end_date=end_date,
-                    )
-                    if rows:
-                        has_data = True
+            return False
+        started = time.monotonic()
+        rows_before, bytes_before = sink.rows_written, sink.bytes_written
+        for topic_type, count_posts in topics.items():
+            check_stopped()
+            is_on = "off" if topic_type in ["discussions", "grants"] else "on"
+            posts = parse_post_listings(
+                url=url,
+                topic_type=topic_type,
+                count_posts=count_posts,
+                is_on=is_on,
+                session=session,
+                page_size=page_size,
+                start_date=start_date,
+                end_date=end_date,
+            )
+            posts = metrics.timed(posts, network, topic_type, "listing")
+            if checkpoint:
+                posts = skip_completed(posts, checkpoint, job, topic_type, stats)
+            logging.info(f"[{topic_type}] Количество постов: {count_posts}")
+            for post_id, rows in fetch_posts_data(
+                url=url,
+                is_on=is_on,
+                proposal_type=topic_type,
+                listings=posts,
+                session=session,
+                concurrency=concurrency,
+                start_date=start_date,
+                end_date=end_date,
+                network=network,
+                state=state,
+                stats=stats,
+            ):
+                with metrics.stage(network, topic_type, "write"):
                     for row in rows:
-                        writer.writerow(row)
+                        sink.write_row(row)
+                    if checkpoint and checkpoint.complete(sink, job, topic_type, post_id):
+                        commit(sink, network, state, checkpoint)
+            with metrics.stage(network, topic_type, "write"):
+                commit(sink, network, state, checkpoint)
+
+    rows_written = sink.rows_written - rows_before
+    stats["rows"] += rows_written
+    metrics.add_rows(network, rows_written)
+    bytes_written = sink.bytes_written - bytes_before
+    elapsed = max(time.monotonic() - started, 1e-9)
+    logging.info(
+        f"[{network}] Записано строк: {rows_written}, {bytes_written / 1024 / 1024:.2f} МБ "
+        f"({bytes_written / 1024 / 1024 / elapsed:.2f} МБ/с)"
+    )
+    return rows_written > 0
+
+
+def commit(sink: Sink, network: str, state: StateStore | None, checkpoint: Checkpoint | None) -> None:
+    """
+    Сбрасывает выходной файл на диск, записывает контрольную точку и сохраняет состояние постов сети.
+
+    Состояние сохраняется последним: если запуск прервется раньше, посты будут запрошены повторно,
+    а не пропущены с потерей строк. Файлы форматов без контрольных точек (`parquet`, `arrow`) можно прочитать
+    только после закрытия, поэтому состояние постов таких сетей сохраняет `run_cycle` после закрытия файлов.
+
+    Аргументы:
+    - `sink (Sink)`: выходной файл.
+    - `network (str)`: название сети.
+    - `state (StateStore, опционально)`: хранилище состояния для инкрементального парсинга.
+    - `checkpoint (Checkpoint, опционально)`: журнал контрольных точек.
 
-    return has_data
+    Возвращает:
+    `None`"""
+    if checkpoint:
+        checkpoint.commit(sink)
+    else:
+        sink.flush()
+    if state and sink.resumable:
+        state.commit(network)
+
+
+def skip_completed(
+    listings: Iterable[dict[str, Any]], checkpoint: Checkpoint, job: int, topic_type: str, stats: Counter[str]
+) -> Iterator[dict[str, Any]]:
+    """
+    Пропускает записи постов, обработанных до перезапуска, и считает их в `stats["completed"]`.
+
+    Аргументы:
+    - `listings (Iterable[dict])`: записи постов из списка постов.
+    - `checkpoint (Checkpoint)`: журнал контрольных точек.
+    - `job (int)`: номер сети в списке `jobs` цикла.
+    - `topic_type (str)`: тип поста.
+    - `stats (Counter)`: счетчики пропущенных запросов постов.
+
+    Возвращает:
+    `Iterator[dict]`: записи необработанных постов."""
+    for listing in listings:
+        if checkpoint.is_completed(job, topic_type, listing["post_id"]):
+            stats["completed"] += 1
+            continue
+        yield listing
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import NamedTuple
+
+
+class Post(NamedTuple):
+    """Поля поста, которые попадают в результаты парсинга, в порядке столбцов `sinks.COLUMNS`."""
+
+    post_type: str
+    topic: str
+    created_at: datetime
+    user_id: int | None
+    username: str | None
+    title: str
+    content: str
+    status: str | None
+    likes: int
+    dislikes: int
+    link: str
+
+
+class Comment(NamedTuple):
+    """
+    Поля комментария или ответа, которые попадают в результаты парсинга, в порядке столбцов `sinks.COLUMNS`.
+
+    У комментария к посту `parent_id` равен None, а `depth` - 0, у ответа - ID комментария или ответа, на который
+    он дан, и глубина вложенности от 1.
+    """
+
+    content: str
+    username: str
+    created_at: datetime
+    likes: int
+    dislikes: int
+    comment_id: str | None
+    parent_id: str | None
+    depth: int
+
+
+class PostRecord(NamedTuple):
+    """
+    Пост и его комментарии, отобранные для записи.
+
+    - `post` (Post): поля поста.
+    - `comments` (list[Comment]): комментарии и ответы, попавшие в период и новые с прошлого цикла.
+    - `post_only` (bool): True, если у поста нет комментариев и нужно записать строку только с полями поста.
+    - `comments_count` (int): количество комментариев и ответов поста в ответе API, кроме ответов на комментарии,
+      которые новее конца периода.
+    - `last_comment_at` (str|None): дата самого нового из них в формате API.
+    """
+
+    post: Post
+    comments: list[Comment]
+    post_only: bool
+    comments_count: int
+    last_comment_at: str | None
+
+
+def parse_timestamp(value: str) -> datetime:
+    """
+    Быстро преобразует дату API Polkassembly (например, `"2023-05-01T10:00:00.000Z"`) в `datetime` с точностью
+    до секунды, без часового пояса.
+
+    Аргументы:
+    - `value` (str): дата в формате ISO 8601.
+
+    Возвращает:
+    `datetime`: дата."""
+    return datetime.fromisoformat(value[:19])
+
+
+def format_timestamp(value: datetime) -> str:
+    """
+    Преобразует дату в формат API Polkassembly (`"2023-05-01T10:00:00.000Z"`), чтобы сравнивать ее со строками
+    дат API без их разбора.
+
+    Аргументы:
+    - `value` (datetime): дата.
+
+    Возвращает:
+    `str`: дата в формате ISO 8601."""
+    return f"{value.strftime('%Y-%m-%dT%H:%M:%S.%f')[:23]}Z"
@@ -1,12 +1,30 @@
+from __future__ import annotations
+
+import argparse
+import importlib.util
 import logging
 import os
+import sys
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import TYPE_CHECKING, Any
 from urllib.parse import urlparse
 
 from arg_parser import parse_args
+from cancellation import stop_executor, stop_requested
+from checkpoint import CHECKPOINT_FILENAME, Checkpoint, restore_outputs
 from logging_utils import setup_logging
-from process_url import process_url
+from metrics import metrics, serve_prometheus
+from scheduler import ScheduleEntry, Scheduler, parse_schedule_line
+from sinks import SINKS, Sink, create_sink
+from state_store import StateStore
+
+# Сетевой стек (requests, а для разбора страниц - bs4 и lxml) импортируется только перед парсингом, поэтому
+# запуск с --help, --check или с ошибкой в аргументах не тратит время на его загрузку.
+if TYPE_CHECKING:
+    from http_cache import HttpCache
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -18,68 +36,402 @@ def fetch_urls_from_file(file_path: str) -> list[str]:
     :param `file_path` (str): путь к файлу со списком URL-адресов.
     :return: `list[str]` список URL-адресов.
     """
+    return [line.split()[0] for line in fetch_lines_from_file(file_path)]
+
+
+def fetch_lines_from_file(file_path: str) -> list[str]:
+    """
+    Функция выдает из файла строки с URL-адресами и их параметрами, удаляя все комментарии и пустые строки.
+
+    :param `file_path` (str): путь к файлу со списком URL-адресов.
+    :return: `list[str]` строки файла.
+    """
     with open(file_path, "r") as urls_file:
-        return [url.strip() for url in urls_file if url.strip() and not url.startswith("#")]
+        return [line.strip() for line in urls_file if line.strip() and not line.startswith("#")]
 
 
-def run(one_file=True) -> None:
-    args = parse_args()
-    setup_logging(args.log)
+def fetch_schedule(args: argparse.Namespace) -> list[ScheduleEntry]:
+    """
+    Функция выдает расписание сетей из аргумента `--url` или файла со списком URL-адресов. Сети без параметра
+    `interval=СЕКУНДЫ` запускаются с интервалом `--interval`. Строки с ошибками пропускаются.
 
-    start_date = datetime.strptime(args.start, "%Y%m%d") if args.start else None
-    end_date = datetime.strptime(args.end, "%Y%m%d") if args.end else None
+    :param `args` (argparse.Namespace): аргументы командной строки.
+    :return: `list[ScheduleEntry]` сети и интервалы их запусков.
+    """
+    lines = [args.url.strip()] if args.url else fetch_lines_from_file(args.urls_file)
+    entries = []
+    for line in lines:
+        try:
+            entries.append(parse_schedule_line(line, args.interval))
+        except ValueError as e:
+            logging.error(f"Строка списка URL-адресов пропущена: {e}")
+    return entries
 
-    if start_date and end_date and end_date <= start_date:
-        logging.error("Дата завершения не может быть меньше даты начала. Завершение программы.")
-        return
 
-    while True:
-        start_time = time.monotonic()
+def plan_cycle(
+    urls: list[str], output_format: str, one_file: bool, workers: int, run_dir: bool = True
+) -> dict[str, Any]:
+    """
+    Функция выбирает выходные файлы цикла парсинга и создает для них директорию.
 
-        urls = [args.url.strip()] if args.url else fetch_urls_from_file(args.urls_file)
-        if not urls:
-            logging.error("Список URL-адресов пуст. Завершение программы.")
-            break
+    :param `urls` (list[str]): список URL-адресов сетей.
+    :param `output_format` (str): формат выходных файлов.
+    :param `one_file` (bool): сохранять ли результаты всех сетей в один файл.
+    :param `workers` (int): количество сетей, которые парсятся параллельно.
+    :param `run_dir` (bool): сохранять ли файлы сетей в отдельную директорию запуска `downloads/YYYY-MM-DD_HH-MM-SS`.
+        Если `False`, файлы сетей сохраняются прямо в `downloads`.
+    :return: `dict` описание цикла: `format` - формат, `file_pathname` - путь к итоговому файлу, `shared` - пишут ли
+        все сети в итоговый файл напрямую, `use_shards` - пишет ли каждая сеть в свою часть итогового файла,
+        `jobs` - список из URL-адреса, названия сети и пути к выходному файлу сети.
+    """
+    # Базы данных SQLite обновляются на месте, поэтому их имена не зависят от времени запуска.
+    sink_class = SINKS[output_format]
+    download_dir = (
+        "downloads"
+        if one_file or not run_dir or sink_class.upsert
+        else os.path.join("downloads", datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
+    )
+    os.makedirs(download_dir, exist_ok=True)
 
-        download_dir = (
-            "downloads" if one_file else os.path.join("downloads", datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))
-        )
-        os.makedirs(download_dir, exist_ok=True)
+    extension = sink_class.extension
+    prefix = "" if sink_class.upsert else f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_"
+    filename = f"{prefix}polkassembly.{extension}"
+    file_pathname = os.path.abspath(f"{download_dir}/{filename}")
+
+    use_shards = one_file and workers > 1
+    jobs = []
+    for index, url in enumerate(urls):
+        url = url.strip()
+        network = urlparse(url).netloc.split(".")[0]
+        if use_shards:
+            output_pathname = f"{file_pathname}.{index}.part"
+        elif one_file:
+            output_pathname = file_pathname
+        else:
+            prefix = "" if sink_class.upsert else f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_"
+            filename = f"{prefix}{network}.{extension}"
+            output_pathname = os.path.abspath(f"{download_dir}/{filename}")
+        jobs.append([url, network, output_pathname])
+
+    return {
+        "format": output_format,
+        "file_pathname": file_pathname,
+        "shared": one_file and not use_shards,
+        "use_shards": use_shards,
+        "jobs": jobs,
+    }
+
+
+def load_checkpoint(checkpoint_pathname: str) -> Checkpoint | None:
+    """
+    Функция читает журнал прерванного цикла парсинга, если его можно продолжить.
+
+    :param `checkpoint_pathname` (str): путь к журналу контрольных точек.
+    :return: `Checkpoint | None` журнал или None, если цикл нужно начать заново.
+    """
+    checkpoint = Checkpoint.load(checkpoint_pathname)
+    if checkpoint is None:
+        logging.info("Прерванный цикл парсинга не найден, запускается новый цикл.")
+    elif not SINKS[checkpoint.cycle["format"]].resumable:
+        logging.warning(f"Продолжение цикла в формате {checkpoint.cycle['format']} не поддерживается.")
+        return None
+    return checkpoint
+
+
+def log_timing_summary(timings: list[tuple[str, float]]) -> None:
+    """
+    Функция выводит в лог время парсинга каждой сети, начиная с самой долгой.
+
+    :param `timings` (list[tuple[str, float]]): пары из названия сети и времени парсинга в секундах.
+    """
+    logging.info("Время парсинга по сетям:")
+    for network, elapsed in sorted(timings, key=lambda timing: timing[1], reverse=True):
+        logging.info(f"  {network}: {elapsed:.1f} с")
+
+
+def log_skipped_summary(stats: Counter[str]) -> None:
+    """
+    Функция выводит в лог количество запросов постов, которые не потребовалось выполнять.
 
-        filename = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_polkassembly.csv"
-        file_pathname = os.path.abspath(f"{download_dir}/{filename}")
+    :param `stats` (Counter[str]): счетчики пропущенных запросов по причинам `outside_window`, `unchanged`
+        и `completed`.
+    """
+    logging.info(
+        f"Сэкономлено запросов постов: {stats['outside_window'] + stats['unchanged']} "
+        f"(за пределами периода: {stats['outside_window']}, без изменений: {stats['unchanged']})"
+    )
+    if stats["completed"]:
+        logging.info(f"Пропущено постов, обработанных до перезапуска: {stats['completed']}")
 
-        written = False
-        for url in urls:
-            url = url.strip()
-            network = urlparse(url).netloc.split(".")[0]
-            logging.info(f"Парсинг запущен для URL: {url}")
-            if not one_file:
-                filename = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{network}.csv"
-                file_pathname = os.path.abspath(f"{download_dir}/{filename}")
 
-            if process_url(
+def run_cycle(
+    args: argparse.Namespace,
+    urls: list[str],
+    one_file: bool,
+    state: StateStore | None,
+    start_date: datetime | None,
+    end_date: datetime | None,
+    checkpoint_pathname: str,
+    resume: bool = False,
+    run_dir: bool = True,
+) -> Counter[str]:
+    """
+    Функция выполняет один цикл парсинга сетей и сохраняет результаты в выходные файлы.
+
+    :param `args` (argparse.Namespace): аргументы командной строки.
+    :param `urls` (list[str]): список URL-адресов сетей.
+    :param `one_file` (bool): сохранять ли результаты всех сетей в один файл.
+    :param `state` (StateStore | None): хранилище состояния для инкрементального парсинга.
+    :param `start_date` (datetime | None): дата начала периода парсинга.
+    :param `end_date` (datetime | None): дата окончания периода парсинга.
+    :param `checkpoint_pathname` (str): путь к журналу контрольных точек цикла.
+    :param `resume` (bool): продолжить прерванный цикл из журнала вместо нового цикла по `urls`.
+    :param `run_dir` (bool): сохранять ли файлы сетей в отдельную директорию запуска (см. `plan_cycle`).
+    :return: `Counter[str]` счетчики цикла: записанные строки `rows` и пропущенные запросы постов.
+    """
+    from process_url import process_url
+
+    checkpoint = load_checkpoint(checkpoint_pathname) if resume else None
+    if checkpoint:
+        cycle = checkpoint.cycle
+        restore_outputs(checkpoint, SINKS[cycle["format"]])
+        logging.info(f"Продолжение прерванного цикла, итоговый файл: {cycle['file_pathname']}")
+    elif not urls:
+        logging.error("Список URL-адресов пуст. Завершение программы.")
+        return Counter()
+    else:
+        cycle = plan_cycle(urls, args.format, one_file, args.workers, run_dir)
+        if SINKS[args.format].resumable:
+            checkpoint = Checkpoint.create(checkpoint_pathname, cycle)
+
+    sink_class = SINKS[cycle["format"]]
+    file_pathname = cycle["file_pathname"]
+    use_shards = cycle["use_shards"]
+    jobs = [
+        (index, url, network, output_pathname, Counter())
+        for index, (url, network, output_pathname) in enumerate(cycle["jobs"])
+    ]
+
+    def open_sink(pathname: str) -> Sink:
+        return create_sink(
+            cycle["format"], pathname, buffer_size=args.write_buffer_kb * 1024, flush_rows=args.flush_rows
+        )
+
+    shared_sink = open_sink(file_pathname) if cycle["shared"] else None
+
+    def crawl(job: tuple[int, str, str, str, Counter[str]]) -> tuple[bool, float]:
+        index, url, network, output_pathname, stats = job
+        finished = checkpoint.finished(index) if checkpoint else None
+        if finished is not None:
+            logging.info(f"Парсинг URL: {url} был завершен до перезапуска")
+            return finished, 0.0
+        logging.info(f"Парсинг запущен для URL: {url}")
+        started = time.monotonic()
+        sink = shared_sink or open_sink(output_pathname)
+        try:
+            has_data = process_url(
                 url,
                 network,
-                file_pathname,
+                sink,
                 start_date=start_date,
                 end_date=end_date,
-            ):
-                written = True
-                logging.info(f"Парсинг завершен для URL: {url} Результат сохранен в {file_pathname}")
+                concurrency=args.concurrency,
+                state=state,
+                page_size=args.page_size,
+                stats=stats,
+                checkpoint=checkpoint,
+                job=index,
+            )
+        finally:
+            if sink is not shared_sink:
+                sink.close()
+        if checkpoint:
+            # Строки, записанные до перезапуска, остаются в файле.
+            has_data = has_data or checkpoint.rows(output_pathname) > 0
+            checkpoint.finish(index, has_data)
+        if has_data:
+            logging.info(f"Парсинг завершен для URL: {url} Результат сохранен в {output_pathname}")
+        else:
+            logging.info(f"Парсинг завершен для URL: {url} Результатов не найдено")
+        return has_data, time.monotonic() - started
+
+    try:
+        if min(args.workers, len(jobs)) <= 1:
+            # В главном потоке парсинг прерывается по CTRL+C без ожидания завершения сети. Флаг останавливает
+            # потоки запросов постов сети.
+            try:
+                results = [crawl(job) for job in jobs]
+            except KeyboardInterrupt:
+                stop_requested.set()
+                raise
+        else:
+            executor = ThreadPoolExecutor(max_workers=args.workers)
+            try:
+                results = list(executor.map(crawl, jobs))
+            except KeyboardInterrupt:
+                stop_executor(executor)
+                raise
+            executor.shutdown()
+    finally:
+        if shared_sink:
+            shared_sink.close()
 
-            else:
-                logging.info(f"Парсинг завершен для URL: {url} Результатов не найдено")
-        if not written:
+    if use_shards:
+        shard_pathnames = [job[3] for job in jobs]
+        data_pathnames = [pathname for pathname, (has_data, _) in zip(shard_pathnames, results) if has_data]
+        if data_pathnames:
+            sink_class.merge(data_pathnames, file_pathname)
+        for shard_pathname in shard_pathnames:
+            if os.path.exists(shard_pathname):
+                os.remove(shard_pathname)
+    elif sink_class.upsert:
+        pass
+    elif cycle["shared"]:
+        if not any(has_data for has_data, _ in results) and os.path.exists(file_pathname):
             os.remove(file_pathname)
+    else:
+        for (_, _, _, output_pathname, _), (has_data, _) in zip(jobs, results):
+            if not has_data and os.path.exists(output_pathname):
+                os.remove(output_pathname)
+    if state and not sink_class.resumable:
+        # Строки этих форматов находятся на диске только после закрытия файлов.
+        for network in {network for _, _, network, _, _ in jobs}:
+            state.commit(network)
+    if checkpoint:
+        checkpoint.remove()
+
+    log_timing_summary([(network, elapsed) for (_, _, network, _, _), (_, elapsed) in zip(jobs, results)])
+    totals = sum((stats for _, _, _, _, stats in jobs), Counter())
+    log_skipped_summary(totals)
+    return totals
+
+
+def finish_cycle(args: argparse.Namespace, cache: HttpCache | None, started: float) -> None:
+    """
+    Функция выводит в лог статистику кеша и сохраняет метрики после завершения цикла парсинга.
+
+    :param `args` (argparse.Namespace): аргументы командной строки.
+    :param `cache` (HttpCache | None): дисковый кеш HTTP-ответов.
+    :param `started` (float): время начала цикла по `time.monotonic`.
+    """
+    if cache:
+        cache.log_stats()
+    metrics.end_cycle(time.monotonic() - started)
+    if args.metrics_file:
+        metrics.write_json(args.metrics_file)
+
+
+def check_args(args: argparse.Namespace) -> list[str]:
+    """
+    Функция проверяет аргументы командной строки и список URL-адресов без запросов к сайтам. Модули сетевого стека
+    и пакет `pyarrow` при этом не импортируются.
+
+    :param `args` (argparse.Namespace): аргументы командной строки.
+    :return: `list[str]` описания найденных ошибок, пустой список - ошибок нет.
+    """
+    errors = []
+    dates = {}
+    for name in ("start", "end"):
+        value = getattr(args, name)
+        if value:
+            try:
+                dates[name] = datetime.strptime(value, "%Y%m%d")
+            except ValueError:
+                errors.append(f"Неверная дата --{name} {value!r}, ожидается формат ГГГГММДД")
+    if "start" in dates and "end" in dates and dates["end"] <= dates["start"]:
+        errors.append("Дата завершения не может быть меньше даты начала")
+
+    for name, minimum in (
+        ("interval", 1),
+        ("concurrency", 1),
+        ("global_concurrency", 1),
+        ("retries", 0),
+        ("workers", 1),
+        ("page_size", 1),
+        ("write_buffer_kb", 1),
+        ("flush_rows", 0),
+        ("cache_max_mb", 1),
+    ):
+        value = getattr(args, name)
+        if value is not None and value < minimum:
+            errors.append(f"Значение --{name.replace('_', '-')} должно быть не меньше {minimum}: {value}")
+    if args.format in ("parquet", "arrow") and importlib.util.find_spec("pyarrow") is None:
+        errors.append(f"Для формата {args.format} установите пакет pyarrow: pip install pyarrow")
 
-        if not args.interval:
-            break
+    try:
+        lines = [args.url.strip()] if args.url else fetch_lines_from_file(args.urls_file)
+    except OSError as e:
+        return [*errors, f"Не удалось прочитать файл со списком URL-адресов: {e}"]
+    if not lines:
+        errors.append("Список URL-адресов пуст")
+    for line in lines:
+        try:
+            entry = parse_schedule_line(line, args.interval or 1)
+        except ValueError as e:
+            errors.append(str(e))
+            continue
+        url = urlparse(entry.url)
+        if url.scheme not in ("http", "https") or not url.netloc:
+            errors.append(f"Неверный URL-адрес: {entry.url}")
+    return errors
+
+
+def run(one_file=True) -> None:
+    args = parse_args()
+    setup_logging(args.log)
+    if args.check:
+        errors = check_args(args)
+        for error in errors:
+            logging.error(error)
+        if errors:
+            sys.exit(1)
+        print("Проверка пройдена")
+        return
+
+    from http_cache import HttpCache
+    from http_client import configure as configure_http
+
+    cache = HttpCache(args.cache_dir, args.cache_max_mb * 1024 * 1024) if args.cache_dir else None
+    configure_http(max_concurrency=args.global_concurrency, max_retries=args.retries, cache=cache)
+
+    start_date = datetime.strptime(args.start, "%Y%m%d") if args.start else None
+    end_date = datetime.strptime(args.end, "%Y%m%d") if args.end else None
+
+    if start_date and end_date and end_date <= start_date:
+        logging.error("Дата завершения не может быть меньше даты начала. Завершение программы.")
+        return
+
+    state = StateStore(args.state_db) if args.state_db else None
+    if args.metrics_port:
+        serve_prometheus(args.metrics_port)
+        logging.info(f"Метрики Prometheus доступны на порту {args.metrics_port} по адресу /metrics")
+
+    if args.interval:
+        # Каждая сеть запускается по своему расписанию и сохраняет результаты каждого запуска в отдельный файл
+        # в директории downloads, без директории запуска, которая осталась бы пустой, если новых строк нет.
+        resumed: set[str] = set()
 
-        elapsed_time = max(time.monotonic() - start_time, 0)
-        sleep_length = max(args.interval - elapsed_time, 0)
-        time.sleep(sleep_length)
+        def run_network(entry: ScheduleEntry) -> int:
+            started = time.monotonic()
+            checkpoint_pathname = os.path.join("downloads", f".checkpoint.{entry.network}.jsonl")
+            resume = args.resume and entry.network not in resumed
+            resumed.add(entry.network)
+            stats = run_cycle(
+                args, [entry.url], False, state, start_date, end_date, checkpoint_pathname, resume, run_dir=False
+            )
+            finish_cycle(args, cache, started)
+            return stats["rows"]
+
+        Scheduler(lambda: fetch_schedule(args), run_network, max_parallel=args.workers).run()
+    else:
+        started = time.monotonic()
+        urls = [args.url.strip()] if args.url else fetch_urls_from_file(args.urls_file)
+        checkpoint_pathname = os.path.join("downloads", CHECKPOINT_FILENAME)
+        run_cycle(args, urls, one_file, state, start_date, end_date, checkpoint_pathname, args.resume)
+        finish_cycle(args, cache, started)
 
+    if state:
+        state.close()
     logging.info("Программа завершена.")
 
 
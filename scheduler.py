@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, NamedTuple
+from urllib.parse import urlparse
+
+from cancellation import stop_executor
+
+RELOAD_SECONDS = 60
+CHANGE_RATE_ALPHA = 0.3
+
+
+class ScheduleEntry(NamedTuple):
+    """Сеть из списка URL-адресов и интервал между ее запусками в секундах."""
+
+    url: str
+    network: str
+    interval: float
+
+
+class NetworkSchedule:
+    """Расписание сети: время следующего запуска и наблюдаемая скорость появления новых строк."""
+
+    def __init__(self, entry: ScheduleEntry, next_run: float) -> None:
+        self.entry = entry
+        self.next_run = next_run
+        self.running = False
+        self.started = 0.0
+        self.last_finished: float | None = None
+        self.change_rate = 0.0
+        self.measured = 0
+
+    def finish(self, rows: int, finished: float) -> None:
+        """
+        Обновляет скорость изменений и время следующего запуска после завершения парсинга сети.
+
+        Скорость изменений - экспоненциальное скользящее среднее количества новых строк в час между запусками.
+        Первый запуск сети загружает все посты за период, поэтому скорость считается только между соседними
+        запусками и до завершения второго запуска остается нулевой. Следующий запуск назначается через `interval`
+        от начала текущего. Если парсинг длился дольше интервала, пропущенные запуски не выполняются, а объединяются
+        в один, который начинается сразу.
+
+        Аргументы:
+        - `rows` (int): количество строк, записанных при запуске.
+        - `finished` (float): время завершения по `time.monotonic`.
+
+        Возвращает:
+        `None`"""
+        if self.last_finished is not None:
+            rate = rows * 3600 / max(finished - self.last_finished, 1)
+            self.change_rate = (
+                rate if self.measured == 0 else CHANGE_RATE_ALPHA * rate + (1 - CHANGE_RATE_ALPHA) * self.change_rate
+            )
+            self.measured += 1
+        self.running = False
+        self.last_finished = finished
+        self.next_run = self.started + self.entry.interval
+        if self.next_run < finished:
+            missed = int((finished - self.started) // self.entry.interval)
+            logging.warning(
+                f"Парсинг сети {self.entry.network} длился дольше интервала {self.entry.interval:g} с, "
+                f"пропущенные запуски ({missed}) объединены в один"
+            )
+            self.next_run = finished
+
+
+class Scheduler:
+    """
+    Планировщик парсинга сетей с отдельным интервалом для каждой сети.
+
+    Сети, время запуска которых наступило, запускаются параллельно, но не больше `max_parallel` одновременно.
+    Если мест не хватает, первыми запускаются сети с наибольшей скоростью изменений. Сеть не запускается
+    повторно, пока не завершен ее предыдущий запуск. Список сетей перечитывается каждые `RELOAD_SECONDS`
+    секунд: новые сети запускаются сразу, удаленные больше не запускаются.
+    """
+
+    def __init__(
+        self,
+        load_entries: Callable[[], list[ScheduleEntry]],
+        run_network: Callable[[ScheduleEntry], int],
+        max_parallel: int = 1,
+    ) -> None:
+        self.load_entries = load_entries
+        self.run_network = run_network
+        self.max_parallel = max(max_parallel, 1)
+        self.networks: dict[str, NetworkSchedule] = {}
+        self._loaded_at: float | None = None
+
+    def run(self) -> None:
+        """Запускает сети по расписанию, пока список сетей не станет пустым."""
+        executor = ThreadPoolExecutor(max_workers=self.max_parallel)
+        try:
+            self._run(executor)
+        except KeyboardInterrupt:
+            # Запущенные сети останавливаются без ожидания завершения их парсинга.
+            stop_executor(executor)
+            raise
+        executor.shutdown()
+
+    def _run(self, executor: ThreadPoolExecutor) -> None:
+        running: dict[Future[int], NetworkSchedule] = {}
+        while True:
+            now = time.monotonic()
+            if self._loaded_at is None or now - self._loaded_at >= RELOAD_SECONDS:
+                self.reload(now)
+            if not self.networks and not running:
+                logging.error("Список URL-адресов пуст. Завершение программы.")
+                return
+
+            for schedule in self.due(now)[: self.max_parallel - len(running)]:
+                schedule.running = True
+                schedule.started = now
+                logging.info(f"Запуск парсинга сети {schedule.entry.network} по расписанию")
+                running[executor.submit(self.run_network, schedule.entry)] = schedule
+
+            done, _ = wait(running, timeout=self.wait_timeout(now, len(running)), return_when=FIRST_COMPLETED)
+            for future in done:
+                schedule = running.pop(future)
+                try:
+                    rows = future.result()
+                except Exception:
+                    logging.exception(f"Ошибка при парсинге сети {schedule.entry.network}")
+                    rows = 0
+                schedule.finish(rows, time.monotonic())
+                logging.info(
+                    f"Следующий запуск сети {schedule.entry.network} через "
+                    f"{max(schedule.next_run - time.monotonic(), 0):.0f} с, "
+                    f"скорость изменений: {schedule.change_rate:.1f} строк/ч"
+                )
+
+    def reload(self, now: float) -> None:
+        """
+        Перечитывает список сетей, сохраняя расписание и скорость изменений уже известных сетей.
+
+        Аргументы:
+        - `now` (float): текущее время по `time.monotonic`.
+
+        Возвращает:
+        `None`"""
+        self._loaded_at = now
+        entries = {entry.url: entry for entry in self.load_entries()}
+        for url in list(self.networks):
+            if url not in entries and not self.networks[url].running:
+                logging.info(f"Сеть {self.networks[url].entry.network} удалена из расписания")
+                del self.networks[url]
+        for url, entry in entries.items():
+            schedule = self.networks.get(url)
+            if schedule is None:
+                self.networks[url] = NetworkSchedule(entry, now)
+            elif schedule.entry != entry:
+                if not schedule.running and schedule.last_finished is not None:
+                    schedule.next_run = schedule.started + entry.interval
+                schedule.entry = entry
+
+    def due(self, now: float) -> list[NetworkSchedule]:
+        """
+        Возвращает сети, время запуска которых наступило, в порядке приоритета: сначала с наибольшей
+        скоростью изменений, при равной скорости - дольше ожидающие запуска.
+
+        Аргументы:
+        - `now` (float): текущее время по `time.monotonic`.
+
+        Возвращает:
+        `list[NetworkSchedule]`: сети для запуска."""
+        due = [schedule for schedule in self.networks.values() if not schedule.running and schedule.next_run <= now]
+        return sorted(due, key=lambda schedule: (-schedule.change_rate, schedule.next_run))
+
+    def wait_timeout(self, now: float, running: int) -> float:
+        """Возвращает время ожидания до следующего запуска, завершения запущенной сети или перечитывания списка."""
+        timeout = RELOAD_SECONDS - (now - (self._loaded_at or now))
+        if running < self.max_parallel:
+            waiting = [schedule.next_run for schedule in self.networks.values() if not schedule.running]
+            if waiting:
+                timeout = min(timeout, min(waiting) - now)
+        return max(timeout, 0.01)
+
+
+def parse_schedule_line(line: str, default_interval: float) -> ScheduleEntry:
+    """
+    Разбирает строку списка URL-адресов: URL-адрес и необязательный интервал сети `interval=СЕКУНДЫ`.
+
+    Аргументы:
+    - `line` (str): строка списка, например `https://moonbeam.polkassembly.network/ interval=900`.
+    - `default_interval` (float): интервал сети, если он не указан в строке.
+
+    Возвращает:
+    `ScheduleEntry`: сеть и интервал ее запусков.
+
+    Исключения:
+    - `ValueError`: если параметр строки не распознан или интервал не является положительным числом."""
+    url, *options = line.split()
+    interval = default_interval
+    for option in options:
+        name, _, value = option.partition("=")
+        if name != "interval":
+            raise ValueError(f"Неизвестный параметр {option!r} в строке: {line}")
+        interval = float(value)
+        if interval <= 0:
+            raise ValueError(f"Интервал должен быть положительным: {line}")
+    return ScheduleEntry(url, urlparse(url).netloc.split(".")[0], interval)
@@ -0,0 +1,529 @@
+from __future__ import annotations
+
+import csv
+import json
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+from typing import Any, Sequence
+
+BATCH_ROWS = 512
+ARROW_BATCH_ROWS = 10000
+
+COLUMNS = [
+    ("post_type", "Post type", "str"),
+    ("topic", "Topic", "str"),
+    ("created_at", "Created at", "datetime"),
+    ("user_id", "User ID", "int"),
+    ("username", "Username", "str"),
+    ("post_title", "Post title", "str"),
+    ("post_content", "Post content", "str"),
+    ("status", "Status", "str"),
+    ("likes", "Likes", "int"),
+    ("dislikes", "Dislikes", "int"),
+    ("comment_content", "Comment content", "str"),
+    ("comment_username", "Comment username", "str"),
+    ("comment_created_at", "Comment created at", "datetime"),
+    ("comment_likes", "Comment likes", "int"),
+    ("comment_dislikes", "Comment dislikes", "int"),
+    ("comment_id", "Comment ID", "str"),
+    ("parent_id", "Parent ID", "str"),
+    ("depth", "Depth", "int"),
+    ("post_link", "Post link", "str"),
+]
+CSV_HEADER = [title for _, title, _ in COLUMNS]
+FIELD_NAMES = [name for name, _, _ in COLUMNS]
+POST_FIELD_NAMES = {*FIELD_NAMES[:10], "post_link"}
+
+
+class Sink:
+    """
+    Базовый класс выходного файла результатов парсинга.
+
+    Строки передаются в `write_row` в порядке столбцов `COLUMNS`: даты - `datetime`, количество реакций - `int`,
+    отсутствующие значения - `None`.
+    """
+
+    extension = ""
+    upsert = False
+    resumable = True
+
+    def __init__(self, file_pathname: str, buffer_size: int = 1024 * 1024, flush_rows: int = 1000) -> None:
+        self.file_pathname = file_pathname
+        self.flush_rows = max(flush_rows, 0)
+        self.rows_written = 0
+        self._flushed_rows = 0
+        self._pending: list[Sequence[Any]] = []
+        self._open(buffer_size)
+
+    def _open(self, buffer_size: int) -> None:
+        """Открывает файл `file_pathname` для дозаписи с буфером размера `buffer_size`."""
+        self._file = open(self.file_pathname, mode="ab", buffering=max(buffer_size, 1))
+        self._start_offset = self._file.tell()
+
+    def __enter__(self) -> Sink:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def bytes_written(self) -> int:
+        """Количество байт, записанных в файл с момента открытия, включая данные в буфере."""
+        return self._file.tell() - self._start_offset
+
+    @property
+    def offset(self) -> int:
+        """Размер файла после сброса накопленных строк на диск."""
+        return self._file.tell()
+
+    def write_row(self, row: Sequence[Any]) -> None:
+        """
+        Добавляет строку в очередь на запись.
+
+        Аргументы:
+        - `row` (Sequence): значения столбцов строки.
+
+        Возвращает:
+        `None`"""
+        self._pending.append(row)
+        self.rows_written += 1
+        if len(self._pending) >= self.batch_rows:
+            self._write_pending()
+        if self.flush_rows and self.rows_written - self._flushed_rows >= self.flush_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Записывает накопленные строки в файл и сбрасывает буфер файла на диск."""
+        self._write_pending()
+        self._file.flush()
+        self._flushed_rows = self.rows_written
+
+    def sync(self) -> None:
+        """Записывает накопленные строки и дожидается их записи на устройство хранения."""
+        self.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """Записывает накопленные строки и закрывает файл."""
+        self._write_pending()
+        self._file.close()
+
+    @property
+    def batch_rows(self) -> int:
+        return BATCH_ROWS
+
+    def _write_pending(self) -> None:
+        if self._pending:
+            self._write_batch(self._pending)
+            self._pending.clear()
+
+    def _write_batch(self, rows: list[Sequence[Any]]) -> None:
+        raise NotImplementedError
+
+    @classmethod
+    def truncate(cls, file_pathname: str, offset: int) -> bool:
+        """
+        Обрезает файл до размера `offset`, удаляя строки, записанные после контрольной точки.
+
+        Аргументы:
+        - `file_pathname` (str): путь к файлу.
+        - `offset` (int): размер файла в контрольной точке.
+
+        Возвращает:
+        `bool`: True, если файл был обрезан."""
+        if os.path.getsize(file_pathname) <= offset:
+            return False
+        os.truncate(file_pathname, offset)
+        return True
+
+    @classmethod
+    def merge(cls, shard_pathnames: list[str], file_pathname: str) -> None:
+        """
+        Объединяет файлы отдельных сетей в один файл в порядке `shard_pathnames`.
+
+        Аргументы:
+        - `shard_pathnames` (list[str]): пути к файлам сетей.
+        - `file_pathname` (str): путь к итоговому файлу.
+
+        Возвращает:
+        `None`"""
+        with open(file_pathname, mode="ab") as target:
+            for shard_pathname in shard_pathnames:
+                with open(shard_pathname, mode="rb") as source:
+                    shutil.copyfileobj(source, target)
+
+
+class CsvSink(Sink):
+    """
+    Запись строк в CSV-файл пакетами через большой буфер.
+
+    Строки накапливаются пакетами по `BATCH_ROWS` и записываются в буфер файла одним вызовом `writerows`.
+    Буфер файла сбрасывается на диск после каждых `flush_rows` строк. Если `flush_rows` равен 0, буфер
+    сбрасывается только при заполнении и при закрытии файла.
+    """
+
+    extension = "csv"
+
+    def __init__(self, file_pathname: str, buffer_size: int = 1024 * 1024, flush_rows: int = 1000) -> None:
+        super().__init__(file_pathname, buffer_size, flush_rows)
+        self._text = _TextWriter(self._file)
+        self._writer = csv.writer(self._text, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        if os.path.getsize(file_pathname) == 0:
+            self._writer.writerow(CSV_HEADER)
+
+    def _write_batch(self, rows: list[Sequence[Any]]) -> None:
+        self._writer.writerows(rows)
+
+    @classmethod
+    def merge(cls, shard_pathnames: list[str], file_pathname: str) -> None:
+        with open(file_pathname, mode="ab") as target:
+            for shard_pathname in shard_pathnames:
+                with open(shard_pathname, mode="rb") as source:
+                    header = source.readline()
+                    if target.tell() == 0:
+                        target.write(header)
+                    shutil.copyfileobj(source, target)
+
+
+class JsonlSink(Sink):
+    """Запись строк в файл JSON Lines: по одному объекту с полями `FIELD_NAMES` на строку, даты в формате ISO 8601."""
+
+    extension = "jsonl"
+
+    def _write_batch(self, rows: list[Sequence[Any]]) -> None:
+        self._file.write(
+            "".join(
+                json.dumps(dict(zip(FIELD_NAMES, row)), ensure_ascii=False, default=_json_default) + "\n"
+                for row in rows
+            ).encode()
+        )
+
+
+class ArrowSink(Sink):
+    """
+    Запись строк в колоночный файл Parquet или Arrow IPC. Требуется пакет `pyarrow`.
+
+    Строки записываются группами по `ARROW_BATCH_ROWS`. Поля поста, которые повторяются в каждой строке его
+    комментариев, хранятся со словарным кодированием, даты - как `timestamp`, количество реакций - как `int64`.
+    """
+
+    extension = "parquet"
+    # Файл без завершающих метаданных нельзя дописать после обрезки, поэтому прерванный цикл не продолжается.
+    resumable = False
+
+    def __init__(
+        self, file_pathname: str, buffer_size: int = 1024 * 1024, flush_rows: int = 1000, file_format: str = "parquet"
+    ) -> None:
+        self.pa = import_pyarrow()
+        if os.path.exists(file_pathname) and os.path.getsize(file_pathname) > 0:
+            raise ValueError(f"Дозапись в существующий файл {file_format} не поддерживается: {file_pathname}")
+        super().__init__(file_pathname, buffer_size, flush_rows)
+        self.file_format = file_format
+        self.schema = arrow_schema(self.pa)
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(self._file, self.schema)
+        else:
+            self._writer = self.pa.ipc.new_stream(self._file, self.schema)
+
+    @property
+    def batch_rows(self) -> int:
+        return ARROW_BATCH_ROWS
+
+    def flush(self) -> None:
+        # Каждый вызов записывает отдельную группу строк, поэтому на диск сбрасываются только полные группы.
+        self._file.flush()
+        self._flushed_rows = self.rows_written
+
+    def close(self) -> None:
+        self._write_pending()
+        self._writer.close()
+        self._file.close()
+
+    def _write_batch(self, rows: list[Sequence[Any]]) -> None:
+        columns = list(zip(*rows))
+        batch = self.pa.RecordBatch.from_arrays(
+            [
+                self.pa.array(values, type=field.type.value_type).dictionary_encode()
+                if self.pa.types.is_dictionary(field.type)
+                else self.pa.array(values, type=field.type)
+                for values, field in zip(columns, self.schema)
+            ],
+            schema=self.schema,
+        )
+        if self.file_format == "parquet":
+            self._writer.write_table(self.pa.Table.from_batches([batch]))
+        else:
+            self._writer.write_batch(batch)
+
+    @classmethod
+    def merge(cls, shard_pathnames: list[str], file_pathname: str) -> None:
+        import pyarrow.parquet as pq
+
+        sink = cls(file_pathname)
+        try:
+            for shard_pathname in shard_pathnames:
+                for batch in pq.ParquetFile(shard_pathname).iter_batches():
+                    sink._writer.write_table(sink.pa.Table.from_batches([batch]))
+                    sink.rows_written += batch.num_rows
+        finally:
+            sink.close()
+
+
+class ArrowIpcSink(ArrowSink):
+    """
+    Запись строк в поток Arrow IPC (`pyarrow.ipc.open_stream`). Требуется пакет `pyarrow`.
+
+    Используется потоковый формат, так как в файловом формате Arrow IPC словарь каждого столбца должен быть
+    одинаковым во всех группах строк.
+    """
+
+    extension = "arrows"
+
+    def __init__(self, file_pathname: str, buffer_size: int = 1024 * 1024, flush_rows: int = 1000) -> None:
+        super().__init__(file_pathname, buffer_size, flush_rows, file_format="arrow")
+
+    @classmethod
+    def merge(cls, shard_pathnames: list[str], file_pathname: str) -> None:
+        sink = cls(file_pathname)
+        try:
+            for shard_pathname in shard_pathnames:
+                with sink.pa.OSFile(shard_pathname) as source:
+                    for batch in sink.pa.ipc.open_stream(source):
+                        sink._writer.write_batch(batch)
+                        sink.rows_written += batch.num_rows
+        finally:
+            sink.close()
+
+
+class SqliteSink(Sink):
+    """
+    Нормализованная запись результатов в базу данных SQLite: таблицы `posts` и `comments`, связанные по `post_link`.
+
+    Поля поста хранятся один раз в таблице `posts`, а не повторяются в каждой строке комментария. Записи
+    обновляются на месте (upsert): пост - по `post_link`, комментарий - по `post_link` и `comment_id`, поэтому
+    повторные циклы парсинга в тот же файл не создают дубликатов. Комментарий без ID обновляется по `post_link`,
+    автору и дате создания. Такой ключ не различает ответы одного автора, написанные в одну секунду, поэтому
+    используется только при отсутствии ID.
+    """
+
+    extension = "sqlite"
+    upsert = True
+
+    def _open(self, buffer_size: int) -> None:
+        # Размер буфера не используется: SQLite сама управляет записью страниц базы.
+        self._start_size = os.path.getsize(self.file_pathname) if os.path.exists(self.file_pathname) else 0
+        self._connection = sqlite3.connect(self.file_pathname, check_same_thread=False)
+        self._connection.executescript(SQLITE_SCHEMA)
+
+    @property
+    def bytes_written(self) -> int:
+        """Изменение размера файла базы данных с момента открытия."""
+        return os.path.getsize(self.file_pathname) - self._start_size
+
+    @property
+    def offset(self) -> int:
+        return os.path.getsize(self.file_pathname)
+
+    def flush(self) -> None:
+        self._write_pending()
+        self._connection.commit()
+        self._flushed_rows = self.rows_written
+
+    def sync(self) -> None:
+        # Зафиксированная транзакция SQLite уже записана на устройство хранения.
+        self.flush()
+
+    @classmethod
+    def truncate(cls, file_pathname: str, offset: int) -> bool:
+        # Незафиксированные транзакции откатываются самой SQLite, а повторная запись постов обновляет их на месте.
+        return False
+
+    def close(self) -> None:
+        self.flush()
+        self._connection.close()
+
+    def _write_batch(self, rows: list[Sequence[Any]]) -> None:
+        # Поля поста повторяются в каждой строке его комментариев, поэтому пост записывается один раз за пакет.
+        posts = {row[18]: row for row in rows}
+        self._connection.executemany(
+            UPSERT_POST, [[*row[:2], _sql_timestamp(row[2]), *row[3:10], row[18]] for row in posts.values()]
+        )
+        comments = [
+            [row[18], *row[10:12], _sql_timestamp(row[12]), *row[13:18]] for row in rows if row[12] is not None
+        ]
+        self._connection.executemany(UPSERT_COMMENT, [comment for comment in comments if comment[6] is not None])
+        self._connection.executemany(UPSERT_KEYLESS_COMMENT, [comment for comment in comments if comment[6] is None])
+
+    @classmethod
+    def merge(cls, shard_pathnames: list[str], file_pathname: str) -> None:
+        sink = cls(file_pathname)
+        try:
+            for shard_pathname in shard_pathnames:
+                sink._connection.execute("ATTACH DATABASE ? AS shard", (shard_pathname,))
+                sink._connection.execute(upsert_sql("posts", SQLITE_POST_COLUMNS, ["post_link"], "shard.posts"))
+                sink._connection.execute(
+                    upsert_sql("comments", SQLITE_COMMENT_COLUMNS, COMMENT_KEY, "shard.comments", COMMENT_HAS_ID)
+                )
+                sink._connection.execute(
+                    upsert_sql(
+                        "comments", SQLITE_COMMENT_COLUMNS, KEYLESS_COMMENT_KEY, "shard.comments", COMMENT_WITHOUT_ID
+                    )
+                )
+                sink._connection.commit()
+                sink._connection.execute("DETACH DATABASE shard")
+        finally:
+            sink.close()
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    post_type TEXT,
+    topic TEXT,
+    created_at TIMESTAMP,
+    user_id INTEGER,
+    username TEXT,
+    post_title TEXT,
+    post_content TEXT,
+    status TEXT,
+    likes INTEGER,
+    dislikes INTEGER,
+    post_link TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS comments (
+    post_link TEXT NOT NULL REFERENCES posts (post_link),
+    comment_content TEXT,
+    comment_username TEXT,
+    comment_created_at TIMESTAMP,
+    comment_likes INTEGER,
+    comment_dislikes INTEGER,
+    comment_id TEXT,
+    parent_id TEXT,
+    depth INTEGER
+);
+CREATE UNIQUE INDEX IF NOT EXISTS comments_id ON comments (post_link, comment_id) WHERE comment_id IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS comments_keyless ON comments (post_link, comment_username, comment_created_at)
+    WHERE comment_id IS NULL;
+"""
+SQLITE_POST_COLUMNS = [*FIELD_NAMES[:10], "post_link"]
+SQLITE_COMMENT_COLUMNS = ["post_link", *FIELD_NAMES[10:18]]
+COMMENT_KEY = ["post_link", "comment_id"]
+KEYLESS_COMMENT_KEY = ["post_link", "comment_username", "comment_created_at"]
+COMMENT_HAS_ID = "comment_id IS NOT NULL"
+COMMENT_WITHOUT_ID = "comment_id IS NULL"
+
+
+def upsert_sql(
+    table: str, columns: list[str], key: list[str], source: str | None = None, where: str | None = None
+) -> str:
+    """
+    Возвращает SQL-запрос вставки с обновлением существующей записи по ключу.
+
+    Аргументы:
+    - `table` (str): название таблицы.
+    - `columns` (list[str]): столбцы таблицы.
+    - `key` (list[str]): столбцы первичного ключа.
+    - `source` (str|None): таблица, из которой копируются строки. Если не указана, значения передаются параметрами.
+    - `where` (str|None): условие частичного уникального индекса ключа. Из `source` копируются только строки,
+      удовлетворяющие ему.
+
+    Возвращает:
+    `str`: SQL-запрос."""
+    names = ", ".join(columns)
+    # Условие WHERE нужно SQLite, чтобы отличить ON CONFLICT от условия соединения в INSERT ... SELECT.
+    values = (
+        f"SELECT {names} FROM {source} WHERE {where or 'true'}"
+        if source
+        else f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+    target = f"({', '.join(key)}) WHERE {where}" if where else f"({', '.join(key)})"
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column not in key)
+    return f"INSERT INTO {table} ({names}) {values} ON CONFLICT {target} DO UPDATE SET {updates}"
+
+
+UPSERT_POST = upsert_sql("posts", SQLITE_POST_COLUMNS, ["post_link"])
+UPSERT_COMMENT = upsert_sql("comments", SQLITE_COMMENT_COLUMNS, COMMENT_KEY, where=COMMENT_HAS_ID)
+UPSERT_KEYLESS_COMMENT = upsert_sql("comments", SQLITE_COMMENT_COLUMNS, KEYLESS_COMMENT_KEY, where=COMMENT_WITHOUT_ID)
+
+
+SINKS: dict[str, type[Sink]] = {
+    "csv": CsvSink,
+    "jsonl": JsonlSink,
+    "parquet": ArrowSink,
+    "arrow": ArrowIpcSink,
+    "sqlite": SqliteSink,
+}
+
+
+def create_sink(output_format: str, file_pathname: str, buffer_size: int = 1024 * 1024, flush_rows: int = 1000) -> Sink:
+    """
+    Открывает выходной файл заданного формата.
+
+    Аргументы:
+    - `output_format` (str): формат файла: `csv`, `jsonl`, `parquet`, `arrow` или `sqlite`.
+    - `file_pathname` (str): путь к файлу.
+    - `buffer_size` (int): размер буфера записи файла в байтах. По умолчанию 1 МБ.
+    - `flush_rows` (int): количество строк, после которых буфер записи сбрасывается на диск. По умолчанию 1000.
+
+    Возвращает:
+    `Sink`: открытый выходной файл."""
+    return SINKS[output_format](file_pathname, buffer_size=buffer_size, flush_rows=flush_rows)
+
+
+def import_pyarrow() -> Any:
+    """
+    Импортирует `pyarrow`, который нужен только для форматов Parquet и Arrow.
+
+    Возвращает:
+    `module`: модуль `pyarrow`.
+
+    Исключения:
+    - `ImportError`: если пакет `pyarrow` не установлен."""
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Для форматов parquet и arrow установите пакет pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def arrow_schema(pa: Any) -> Any:
+    """
+    Возвращает схему Arrow для столбцов `COLUMNS`.
+
+    Аргументы:
+    - `pa` (module): модуль `pyarrow`.
+
+    Возвращает:
+    `pyarrow.Schema`: схема выходного файла."""
+    types = {"str": pa.string(), "int": pa.int64(), "datetime": pa.timestamp("ms")}
+    return pa.schema(
+        [
+            pa.field(name, pa.dictionary(pa.int32(), pa.string()))
+            if kind == "str" and name in POST_FIELD_NAMES
+            else pa.field(name, types[kind])
+            for name, _, kind in COLUMNS
+        ]
+    )
+
+
+class _TextWriter:
+    """Обертка, позволяющая `csv.writer` писать строки в двоичный файл."""
+
+    def __init__(self, file: Any) -> None:
+        self._file = file
+
+    def write(self, text: str) -> int:
+        return self._file.write(text.encode())
+
+
+def _sql_timestamp(value: datetime | None) -> str | None:
+    return value.isoformat(" ") if value else None
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
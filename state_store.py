@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, NamedTuple
+
+
+class PostState(NamedTuple):
+    """Сохраненное состояние поста с прошлого цикла парсинга."""
+
+    comments_count: int
+    last_comment_at: str | None
+    content_hash: str
+    date_window: str
+
+
+def date_window(start_date: datetime | None, end_date: datetime | None) -> str:
+    """
+    Возвращает период парсинга в виде строки `ГГГГММДД-ГГГГММДД` для сравнения с периодом сохраненного состояния.
+    Граница, которая не задана, остается пустой.
+
+    Аргументы:
+    - `start_date` (datetime|None): дата начала периода.
+    - `end_date` (datetime|None): дата конца периода.
+
+    Возвращает:
+    `str`: период парсинга."""
+    return f"{start_date.strftime('%Y%m%d') if start_date else ''}-{end_date.strftime('%Y%m%d') if end_date else ''}"
+
+
+def listing_hash(listing: dict[str, Any]) -> str:
+    """
+    Возвращает хеш записи поста из списка постов API.
+
+    Аргументы:
+    - `listing` (dict): запись поста из ответа `listing/{is_on}-chain-posts`.
+
+    Возвращает:
+    `str`: SHA-1 хеш записи в шестнадцатеричном виде."""
+    payload = json.dumps(listing, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class StateStore:
+    """
+    Локальное хранилище состояния постов в SQLite для инкрементального парсинга.
+
+    Ключом является сеть, тип поста и ID поста. Для каждого поста хранятся количество комментариев,
+    дата самого нового комментария, хеш записи из списка постов и период `--start`/`--end`, в котором были
+    отобраны комментарии.
+
+    Новые состояния накапливаются в памяти и сохраняются в базу вызовом `commit` после того, как строки постов
+    сброшены на диск. Так прерванный запуск не отмечает посты обработанными раньше, чем записаны их строки.
+    """
+
+    def __init__(self, db_pathname: str) -> None:
+        self._lock = threading.Lock()
+        self._pending: dict[str, list[tuple[str, str, str, PostState]]] = defaultdict(list)
+        self._connection = sqlite3.connect(db_pathname, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS posts (
+                network TEXT NOT NULL,
+                proposal_type TEXT NOT NULL,
+                post_id TEXT NOT NULL,
+                comments_count INTEGER NOT NULL,
+                last_comment_at TEXT,
+                content_hash TEXT NOT NULL,
+                date_window TEXT,
+                PRIMARY KEY (network, proposal_type, post_id)
+            )
+            """
+        )
+        self._connection.commit()
+
+    def get(self, network: str, proposal_type: str, post_id: int | str) -> PostState | None:
+        """
+        Возвращает сохраненное состояние поста или None, если пост еще не встречался.
+
+        Аргументы:
+        - `network` (str): название сети.
+        - `proposal_type` (str): тип поста.
+        - `post_id` (int|str): ID поста.
+
+        Возвращает:
+        `PostState | None`: состояние поста."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT comments_count, last_comment_at, content_hash, date_window FROM posts "
+                "WHERE network = ? AND proposal_type = ? AND post_id = ?",
+                (network, proposal_type, str(post_id)),
+            ).fetchone()
+        return PostState(*row) if row else None
+
+    def update(self, network: str, proposal_type: str, post_id: int | str, state: PostState) -> None:
+        """
+        Добавляет состояние поста в очередь на сохранение до следующего вызова `commit` для сети.
+
+        Аргументы:
+        - `network` (str): название сети.
+        - `proposal_type` (str): тип поста.
+        - `post_id` (int|str): ID поста.
+        - `state` (PostState): новое состояние поста.
+
+        Возвращает:
+        `None`"""
+        with self._lock:
+            self._pending[network].append((network, proposal_type, str(post_id), state))
+
+    def commit(self, network: str) -> None:
+        """
+        Сохраняет в базу накопленные состояния постов сети.
+
+        Аргументы:
+        - `network` (str): название сети.
+
+        Возвращает:
+        `None`"""
+        with self._lock:
+            pending = self._pending.pop(network, [])
+            if not pending:
+                return
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO posts "
+                "(network, proposal_type, post_id, comments_count, last_comment_at, content_hash, date_window) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(network, proposal_type, post_id, *state) for network, proposal_type, post_id, state in pending],
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        """Закрывает соединение с базой данных."""
+        with self._lock:
+            self._connection.close()